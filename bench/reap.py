@@ -0,0 +1,65 @@
+"""Coût d'un reap (process_exited) selon la taille de la flotte.
+
+    python3 bench/reap.py [taille...]
+
+Pas de vrai fork : les instances sont indexées avec des PIDs fictifs puis
+toutes « reapées » dans l'ordre inverse (le pire cas pour un parcours
+linéaire). La colonne « scan seul » mesure uniquement la recherche d'avant
+l'index PID (parcours de tous les programmes et instances), sans le reste
+du reap.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.program_config import ProgramConfig
+from process.manager import ProcessManager
+from process.program import Program
+
+PER_PROGRAM = 10
+BASE_PID = 100000
+
+
+def fleet(size):
+    manager = ProcessManager(log_level="ERROR")
+    if manager.journal is not None:
+        # les exits fictifs n'ont rien à faire dans le vrai journal
+        manager.event_hooks.remove(manager.journal.record)
+        manager.journal.close()
+    for i in range(size // PER_PROGRAM):
+        program = Program(ProgramConfig(
+            name=f"p{i}", cmd="true", numprocs=PER_PROGRAM, autorestart="never",
+        ))
+        manager.add_program(program)
+        for j, inst in enumerate(program.processes):
+            manager.track_instance(program, inst, BASE_PID + i * PER_PROGRAM + j)
+    return manager
+
+
+def reap(size):
+    manager = fleet(size)
+    for pid in range(BASE_PID + size - 1, BASE_PID - 1, -1):
+        manager._exited_pids.append((pid, 0, None))
+    start = time.perf_counter()
+    manager.process_exited()
+    return (time.perf_counter() - start) / size
+
+
+def scan(size):
+    manager = fleet(size)
+    start = time.perf_counter()
+    for pid in range(BASE_PID + size - 1, BASE_PID - 1, -1):
+        next(
+            (prog, inst) for prog in manager.programs.values()
+            for inst in prog.processes if inst.pid == pid
+        )
+    return (time.perf_counter() - start) / size
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100, 1000, 5000]
+    print(f"{'instances':>10} {'reap':>14} {'scan seul':>14}")
+    for size in sizes:
+        print(f"{size:>10} {reap(size) * 1e6:>10.1f} us {scan(size) * 1e6:>10.1f} us")
@@ -0,0 +1,147 @@
+"""Latence de `status` sur le socket de contrôle sous N clients concurrents.
+
+    python3 bench/socket_load.py [clients] [durée] [bloqués] [programmes]
+
+Lance un daemon sur une config de `programmes` programmes (`sleep 1000`),
+puis `clients` pollers (10 processus x threads) envoient `status` en
+boucle, une connexion par requête, pendant `durée` secondes. `bloqués`
+clients se connectent et n'envoient qu'un bout de ligne. Le daemon est
+arrêté (programmes compris) à la fin. Défauts : 100 5 0 100.
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOCKET_PATH = "/tmp/taskmaster.sock"
+PROCS = 10  # processus clients : le GIL d'un seul ne suffirait pas à charger le daemon
+
+
+def command(line):
+    s = socket.socket(socket.AF_UNIX)
+    s.settimeout(5)
+    s.connect(SOCKET_PATH)
+    s.sendall(line.encode() + b"\n")
+    chunks = []
+    while True:
+        data = s.recv(65536)
+        if not data:
+            break
+        chunks.append(data)
+    s.close()
+    return b"".join(chunks)
+
+
+def start_daemon(programs, workdir):
+    path = os.path.join(workdir, "load.yaml")
+    with open(path, "w") as f:
+        f.write("programs:\n")
+        for i in range(programs):
+            f.write(f"  p{i}:\n    cmd: \"sleep 1000\"\n    autostart: true\n    starttime: 0\n")
+    subprocess.run([sys.executable, os.path.join(ROOT, "bonus", "daemon.py"), path], cwd=ROOT)
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            if command("status").count(b"RUNNING") >= programs:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    sys.exit("daemon not ready after 10s")
+
+
+def poll(duration, programs, latencies, errors, lock):
+    end = time.time() + duration
+    while time.time() < end:
+        start = time.perf_counter()
+        try:
+            ok = command("status").count(b"\n") >= programs
+        except OSError:
+            ok = False
+        with lock:
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors[0] += 1
+
+
+def client_process(threads, duration, programs, w):
+    latencies, errors, lock = [], [0], threading.Lock()
+    workers = [
+        threading.Thread(target=poll, args=(duration, programs, latencies, errors, lock))
+        for _ in range(threads)
+    ]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    os.write(w, json.dumps([latencies, errors[0]]).encode())
+    os._exit(0)
+
+
+def run(clients, duration, stalled, programs):
+    stalled_socks = []
+    for _ in range(stalled):
+        s = socket.socket(socket.AF_UNIX)
+        s.connect(SOCKET_PATH)
+        s.sendall(b"sta")
+        stalled_socks.append(s)
+
+    readers = []
+    for p in range(PROCS):
+        r, w = os.pipe()
+        if os.fork() == 0:
+            os.close(r)
+            client_process(clients // PROCS, duration, programs, w)
+        os.close(w)
+        readers.append(r)
+
+    latencies, errors = [], 0
+    for r in readers:
+        chunks = []
+        while True:
+            data = os.read(r, 1 << 20)
+            if not data:
+                break
+            chunks.append(data)
+        os.close(r)
+        lat, err = json.loads(b"".join(chunks))
+        latencies += lat
+        errors += err
+    for _ in readers:
+        os.wait()
+    for s in stalled_socks:
+        s.close()
+
+    if not latencies:
+        sys.exit(f"no successful request ({errors} errors)")
+    latencies.sort()
+    q = lambda p: latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000
+    print(
+        f"{clients} pollers + {stalled} stalled, {programs} programs: "
+        f"{len(latencies)} ok, {errors} errors, {len(latencies) / duration:.0f} req/s, "
+        f"p50 {q(.5):.1f} ms p99 {q(.99):.1f} ms max {latencies[-1] * 1000:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    args = [int(a) if i != 1 else float(a) for i, a in enumerate(sys.argv[1:5])]
+    clients, duration, stalled, programs = args + [100, 5.0, 0, 100][len(args):]
+    try:
+        command("status")
+        sys.exit(f"a daemon already listens on {SOCKET_PATH}, stop it first")
+    except OSError:
+        pass
+    with tempfile.TemporaryDirectory() as workdir:
+        start_daemon(programs, workdir)
+        try:
+            run(clients, duration, stalled, programs)
+        finally:
+            command("stop all")
+            time.sleep(1)
+            command("shutdown")
@@ -1,15 +1,19 @@
 # bonus/alerting.py
 import json
 import time
+from utils.rotation import RotatingFile
+from utils.log_pipeline import pipeline, format_time
 
 ALERT_FILE = "/tmp/taskmaster_alerts.log"
+alert_log = RotatingFile(ALERT_FILE)
 
-def send_alert(event: str, payload: dict):
+def _emit(ts, event, payload):
     alert = {
-        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "timestamp": format_time(ts),
         "event": event,
         "payload": payload,
     }
+    return ((alert_log, json.dumps(alert) + "\n"),)
 
-    with open(ALERT_FILE, "a") as f:
-        f.write(json.dumps(alert) + "\n")
+def send_alert(event: str, payload: dict):
+    pipeline.submit(_emit, time.time(), event, payload)
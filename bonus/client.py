@@ -1,4 +1,5 @@
 import socket
+import json
 import sys
 import tty
 import termios
@@ -31,12 +32,95 @@ def interactive_mode(sock):
     finally:
         termios.tcsetattr(sys.stdin.fileno(), termios.TCSADRAIN, old_settings)
 
+def follow_mode(client, command):
+    """tail -f : protocole texte, flux sans fin arrêté par Ctrl-C."""
+    client.sendall((command + "\n").encode())
+    client.settimeout(None)
+    try:
+        while True:
+            data = client.recv(65536)
+            if not data:
+                break
+            sys.stdout.write(data.decode(errors="replace"))
+            sys.stdout.flush()
+    except ConnectionResetError:
+        print("Connection closed by daemon")
+    except KeyboardInterrupt:
+        print()
+
+
+def watch_mode(client, parts, as_json):
+    """watch : transitions poussées par le daemon jusqu'à Ctrl-C."""
+    client.sendall((json.dumps({"id": 0, "cmd": "watch", "args": parts[1:]}) + "\n").encode())
+    client.settimeout(None)
+    try:
+        for line in client.makefile("rb"):
+            message = json.loads(line)
+            if not message.get("more"):
+                # fin du flux : erreur (programme inconnu)
+                print(json.dumps(message) if as_json else "\n".join(message["lines"]))
+                return message.get("ok", False)
+            if as_json:
+                for delta in message.get("data", ()):
+                    print(json.dumps(delta), flush=True)
+            else:
+                print("\n".join(message["lines"]), flush=True)
+    except ConnectionResetError:
+        print("Connection closed by daemon")
+    except KeyboardInterrupt:
+        print()
+        return True
+    return False
+
+
+def request_mode(client, commands, as_json):
+    """Toutes les requêtes partent d'un coup (pipelining), puis on lit les
+    réponses dans l'ordre ; les morceaux ("more") sont recollés.
+    Renvoie False si une commande a échoué."""
+    requests = [
+        json.dumps({"id": i, "cmd": parts[0], "args": parts[1:]}) + "\n"
+        for i, parts in enumerate(cmd.split() for cmd in commands)
+    ]
+    client.sendall("".join(requests).encode())
+    stream = client.makefile("rb")
+    all_ok = True
+    for _ in requests:
+        response = {"lines": []}
+        while True:
+            line = stream.readline()
+            if not line:
+                print("ERR connection closed by daemon")
+                return False
+            message = json.loads(line)
+            response["id"] = message.get("id")
+            response["lines"] += message["lines"]
+            data = message.get("data")
+            if isinstance(data, list):
+                response.setdefault("data", []).extend(data)  # découpée comme lines
+            elif data is not None:
+                response["data"] = data
+            if not message.get("more"):
+                response["ok"] = message.get("ok", False)
+                break
+        all_ok = all_ok and response["ok"]
+        if as_json:
+            print(json.dumps(response))
+        elif response["lines"]:
+            print("\n".join(response["lines"]))
+    return all_ok
+
+
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: client.py <command>")
+    args = sys.argv[1:]
+    as_json = "--json" in args
+    if as_json:
+        args.remove("--json")
+    if not args:
+        print("Usage: client.py [--json] <command> [; <command> ...]")
         sys.exit(1)
 
-    command = " ".join(sys.argv[1:])
+    # plusieurs commandes séparées par ';' partent sur la même connexion
+    commands = [c.strip() for c in " ".join(args).split(";") if c.strip()]
 
     client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
     client.settimeout(2)
@@ -46,21 +130,27 @@ def main():
         print("ERR daemon not running or socket closed")
         sys.exit(1)
 
-    if command.startswith("attach"):
-        program = command.split()[1]
+    first = commands[0].split()
+    ok = True
+    if first[0] == "attach" and len(commands) == 1:
+        program = first[1] if len(first) > 1 else ""
         client.sendall(f"attach {program}\n".encode())
         interactive_mode(client)
-        return
-    client.sendall((command + "\n").encode())
-    try:
-        response = client.recv(4096).decode()
-        print(response.strip())
-    except socket.timeout:
-        print("ERR timeout: no response from daemon")
-    except ConnectionResetError:
-        print("Connection closed by daemon")
-
+    elif first[0] == "tail" and "-f" in first and len(commands) == 1:
+        follow_mode(client, commands[0])
+    elif first[0] == "watch" and len(commands) == 1:
+        ok = watch_mode(client, first, as_json)
+    else:
+        try:
+            ok = request_mode(client, commands, as_json)
+        except socket.timeout:
+            print("ERR timeout: no response from daemon")
+            ok = False
+        except ConnectionResetError:
+            print("Connection closed by daemon")
+            ok = False
     client.close()
+    sys.exit(0 if ok else 1)
 
 if __name__ == "__main__":
     main()
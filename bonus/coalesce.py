@@ -0,0 +1,127 @@
+import time
+from utils.log_pipeline import format_time
+
+COALESCE_WINDOW = 5.0  # secondes pendant lesquelles un (event, programme) est regroupé
+SAMPLE_PIDS = 10       # pids gardés en exemple dans un résumé
+# sink -> (alertes par seconde, rafale max) ; un sink absent n'est pas limité
+SINK_RATES = {
+    "file": (20, 100),
+    "log": (20, 100),
+    "webhook": (5, 20),
+}
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "stamp", "suppressed")
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = time.monotonic()
+        self.suppressed = 0  # alertes refusées depuis la dernière acceptée
+
+    def allow(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        self.suppressed += 1
+        return False
+
+
+class _Group:
+    __slots__ = ("first", "last", "count", "pids")
+
+    def __init__(self, now):
+        self.first = now
+        self.last = now
+        self.count = 0   # alertes absorbées depuis l'ouverture de la fenêtre
+        self.pids = []
+
+
+class AlertCoalescer:
+    """Étage devant les sinks d'alertes (fichier, log, webhook).
+
+    La première alerte d'un couple (event, programme) part tout de suite et
+    ouvre une fenêtre de `window` secondes ; les suivantes y sont comptées.
+    À la fin de la fenêtre, s'il y en a eu, un seul résumé part (count,
+    first / last, quelques pids) et une nouvelle fenêtre s'ouvre : pendant
+    une tempête de crashs, on envoie une alerte par programme et par fenêtre.
+
+    Chaque sink a en plus son token bucket (SINK_RATES) ; une alerte refusée
+    est comptée et le nombre est joint (`suppressed`) à la suivante acceptée.
+    timers : TimerWheel du manager (fin des fenêtres).
+    """
+
+    def __init__(self, sinks, timers, window=COALESCE_WINDOW, rates=SINK_RATES):
+        self.sinks = sinks  # nom -> callable(alert)
+        self.timers = timers
+        self.window = window
+        self.buckets = {name: TokenBucket(*rates[name]) for name in sinks if name in rates}
+        self.groups = {}
+        self.stats = {"received": 0, "coalesced": 0, "summaries": 0}
+        self.rate_limited = dict.fromkeys(sinks, 0)
+
+    def add(self, event, payload):
+        self.stats["received"] += 1
+        now = time.time()
+        key = (event, payload.get("program"))
+        group = self.groups.get(key)
+        if group is None or self.window <= 0:
+            if self.window > 0:
+                self._open(key, now)
+            self._dispatch({"timestamp": format_time(now), "event": event, "payload": payload})
+            return
+        group.count += 1
+        group.last = now
+        pid = payload.get("pid")
+        if pid is not None and len(group.pids) < SAMPLE_PIDS:
+            group.pids.append(pid)
+        self.stats["coalesced"] += 1
+
+    def _open(self, key, now):
+        self.groups[key] = _Group(now)
+        self.timers.schedule(self.window, self._close, key)
+
+    def _close(self, key, reopen=True):
+        group = self.groups.pop(key, None)
+        if group is None or not group.count:
+            return  # fenêtre calme : la prochaine alerte repartira immédiatement
+        event, program = key
+        payload = {
+            "program": program,
+            "count": group.count,
+            "first": format_time(group.first),
+            "last": format_time(group.last),
+        }
+        if group.pids:
+            payload["pids"] = group.pids
+        self.stats["summaries"] += 1
+        self._dispatch({
+            "timestamp": format_time(group.last), "event": event,
+            "coalesced": True, "payload": payload,
+        })
+        if reopen:
+            self._open(key, time.time())
+
+    def flush(self):
+        """Envoie tous les résumés en attente (arrêt du daemon)."""
+        for key in list(self.groups):
+            self._close(key, reopen=False)
+
+    def _dispatch(self, alert):
+        now = time.monotonic()
+        for name, send in self.sinks.items():
+            bucket = self.buckets.get(name)
+            if bucket is not None:
+                suppressed = bucket.suppressed
+                if not bucket.allow(now):
+                    self.rate_limited[name] += 1
+                    continue
+                if suppressed:
+                    bucket.suppressed = 0
+                    send(dict(alert, suppressed=suppressed))
+                    continue
+            send(alert)
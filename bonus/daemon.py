@@ -110,16 +110,21 @@
 
 import os
 import sys
-import time
 import signal
 import atexit
 import fcntl
+import asyncio
 from socket_server import SocketServer
+from metrics_http import MetricsServer
 from bonus.manager_wrapper import ManagerWrapper
+from config.watcher import ConfigWatcher
+from bonus.logger import DAEMON_LOG, DAEMON_LOG_MAXBYTES, DAEMON_LOG_BACKUPS, daemon_log
+from utils.rotation import RotatingFile
 
 PID_FILE = "/tmp/taskmaster_daemon.pid"
 LOCK_FILE = "/tmp/taskmaster_daemon.lock"
 LOG_FILE = os.path.join(os.path.dirname(__file__), "logs/daemon.log")
+RELOAD_DEBOUNCE = 0.2  # secondes, regroupe les écritures d'un même déploiement
 
 IS_DAEMON = False
 
@@ -133,9 +138,12 @@ def daemonize(log_file=None):
     os.umask(0)
     if log_file:
         os.makedirs(os.path.dirname(log_file), exist_ok=True)
-        log_f = open(log_file, "a+", buffering=1)
-        os.dup2(log_f.fileno(), 1)
-        os.dup2(log_f.fileno(), 2)
+        # même RotatingFile que bonus.logger : après rotation stdout / stderr
+        # suivent le nouveau fichier
+        if os.path.abspath(log_file) == os.path.abspath(DAEMON_LOG):
+            daemon_log.attach_stdio()
+        else:
+            RotatingFile(log_file, DAEMON_LOG_MAXBYTES, DAEMON_LOG_BACKUPS).attach_stdio()
     with open(PID_FILE, "w") as f:
         f.write(str(os.getpid()))
     atexit.register(lambda: os.path.exists(PID_FILE) and os.remove(PID_FILE))
@@ -151,27 +159,103 @@ def acquire_lock():
         sys.exit(1)
     return fd
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: daemon.py <config.yaml> [--no-daemon]")
-        sys.exit(1)
-    config_path = sys.argv[1]
-    no_daemon = len(sys.argv) == 3 and sys.argv[2] == "--no-daemon"
+async def serve(manager, config_path):
+    """Cœur du daemon : une seule boucle asyncio possède signaux, sorties
+    des enfants, clients du socket de contrôle, pipes de sortie et timers.
+    Aucun polling : la boucle dort tant qu'aucun événement n'arrive."""
+    loop = asyncio.get_running_loop()
+    manager.loop = loop
+    stopping = asyncio.Event()
+    reaped = asyncio.Event()  # shutdown : plus aucun enfant à reaper
+
+    def on_exception(loop, context):
+        error = context.get("exception") or context.get("message")
+        manager.send_alert("daemon_exception", {"error": str(error)})
+        manager.log(f"[Daemon] Exception caught: {error}", level="ERROR")
+
+    def on_sigchld():
+        manager.reap_children()
+        manager.process_exited()
+        if stopping.is_set() and not manager.has_children():
+            reaped.set()
+
+    # Timers du manager (start checks, deadlines de stop, restarts différés) :
+    # un seul call_at armé sur la prochaine échéance de la roue
+    timer_handle = None
+
+    def fire_timers():
+        nonlocal timer_handle
+        timer_handle = None
+        manager.timers.advance()
+        arm_timers()
+
+    def arm_timers(deadline=None):
+        nonlocal timer_handle
+        if deadline is None:
+            timeout = manager.timers.timeout()
+            if timeout is None:
+                return
+            deadline = loop.time() + timeout
+        if timer_handle is not None:
+            if timer_handle.when() <= deadline:
+                return
+            timer_handle.cancel()
+        timer_handle = loop.call_at(deadline, fire_timers)
+
+    # Auto-reload : fichier principal + conf.d surveillés (inotify, sinon
+    # polling stat) ; les événements sont regroupés sur RELOAD_DEBOUNCE et
+    # seuls les programmes des fichiers modifiés sont rechargés
+    watcher = ConfigWatcher(config_path)
+    changed_files = set()
+    reload_handle = None
+
+    def reload(paths=None):
+        manager.reload_config(paths)
+        watcher.update(manager.config_files, manager.config_includes)
+
+    def apply_reload():
+        nonlocal reload_handle, changed_files
+        reload_handle = None
+        paths, changed_files = changed_files, set()
+        reload(paths)
+
+    def on_config_change(paths):
+        nonlocal reload_handle, changed_files
+        if paths is None:
+            changed_files = None  # overflow inotify : reload complet
+        elif not paths:
+            return
+        elif changed_files is not None:
+            changed_files |= paths
+        if reload_handle is None:
+            reload_handle = loop.call_later(RELOAD_DEBOUNCE, apply_reload)
+
+    def poll_config():
+        on_config_change(watcher.poll())
+        loop.call_later(watcher.poll_interval, poll_config)
+
+    manager.timers.on_schedule = arm_timers
+    loop.set_exception_handler(on_exception)
+    # Gestion SIGCHLD / SIGTERM / SIGHUP
+    loop.add_signal_handler(signal.SIGCHLD, on_sigchld)
+    loop.add_signal_handler(signal.SIGHUP, reload)
+    loop.add_signal_handler(signal.SIGTERM, stopping.set)
+    # sorties des enfants : le fd epoll du multiplexeur, un seul reader
+    loop.add_reader(manager.output.fileno(), manager.output.poll)
 
-    lock_fd = acquire_lock()
-    if not no_daemon:
-        daemonize(log_file=LOG_FILE)
-
-    manager = ManagerWrapper(config_path, is_daemon=IS_DAEMON)
     manager.manager.log("[Daemon] Loading configuration without autostart")
 
-    from config.loader import ConfigLoader
-    from process.instance import ProcessInstance
+    from config.loader import ConfigLoader, ConfigError
     from utils.enums import ProcessState
+    from process.boot import BootPlanner
 
     # Charger la config
     loader = ConfigLoader(config_path)
-    programs = loader.load()
+    try:
+        programs = loader.load()
+    except ConfigError as e:
+        manager.log(f"[Daemon] Invalid configuration: {e}", level="ERROR")
+        return
 
     manager.manager.programs = {}
     for program in programs:
@@ -179,41 +263,60 @@ def main():
 
     # 1️⃣ Initialiser toutes les instances avant autostart
     for prog in manager.manager.programs.values():
-        prog.processes = [ProcessInstance() for _ in range(prog.config.numprocs)]
+        prog.remove_instances(0)
+        prog.add_instances(prog.config.numprocs)
         for inst in prog.processes:
             inst.state = ProcessState.STOPPED
 
-    # 2️⃣ Lancer les programmes avec autostart
-    for prog in manager.manager.programs.values():
-        if prog.config.autostart:
-            print(f"[DEBUG] Starting program {prog.config.name} as {prog.config.user}")
-            manager.start_program(prog.config.name)
-
-    manager.send_alert("daemon_started", {"pid": os.getpid()})
+    manager.manager.config_files, manager.manager.config_includes = loader.files, loader.includes
+    watcher.update(loader.files, loader.includes)
+    if watcher.fileno() is not None:
+        loop.add_reader(watcher.fileno(), lambda: on_config_change(watcher.read_changes()))
+    else:
+        loop.call_later(watcher.poll_interval, poll_config)
 
     # Socket server pour communication
     socket_server = SocketServer(manager)
-    socket_server.start()
-
-    # Gestion SIGTERM / SIGHUP
-    def handle_term(signum, frame):
-        manager.send_alert("daemon_stopping", {"signal": signum})
-        manager.log("[Daemon] SIGTERM received, stopping all programs...")
-        for prog in manager.programs.values():
-            manager.stop_program(prog.config.name)
-        sys.exit(0)
+    await socket_server.start()
+    metrics_server = MetricsServer(manager.sampler)
+    await metrics_server.start()
+
+    # 2️⃣ Lancer les programmes avec autostart (vagues de dépendances)
+    boot = BootPlanner(manager)
+    while not boot.step() and not stopping.is_set():
+        await asyncio.sleep(boot.timeout())
 
-    signal.signal(signal.SIGTERM, handle_term)
-    signal.signal(signal.SIGHUP, lambda s,f: manager.reload_config())
+    manager.send_alert("daemon_started", {"pid": os.getpid()})
+    manager.sampler.start()
+
+    await stopping.wait()
+
+    manager.send_alert("daemon_stopping", {"signal": signal.SIGTERM})
+    manager.log("[Daemon] SIGTERM received, stopping all programs...")
+    socket_server.cleanup()  # plus de start pendant l'arrêt
+    metrics_server.cleanup()
+    for prog in manager.programs.values():
+        manager.stop_program(prog.config.name)
+    # la boucle tourne jusqu'au reaping du dernier enfant : les deadlines de
+    # stop y envoient SIGKILL après stoptime, et aucun SIGCHLD n'arrive
+    # pendant que asyncio ferme son self-pipe
+    if manager.has_children():
+        await reaped.wait()
+    manager.alerts.flush()  # résumés des fenêtres encore ouvertes
 
-    # Boucle principale
-    while True:
-        try:
-            manager.process_exited()
-            time.sleep(0.5)
-        except Exception as e:
-            manager.send_alert("daemon_exception", {"error": str(e)})
-            manager.log(f"[Daemon] Exception caught: {e}", level="ERROR")
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: daemon.py <config.yaml> [--no-daemon]")
+        sys.exit(1)
+    config_path = sys.argv[1]
+    no_daemon = len(sys.argv) == 3 and sys.argv[2] == "--no-daemon"
+
+    lock_fd = acquire_lock()
+    if not no_daemon:
+        daemonize(log_file=LOG_FILE)
+
+    manager = ManagerWrapper(config_path, is_daemon=IS_DAEMON)
+    asyncio.run(serve(manager, config_path))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
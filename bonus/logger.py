@@ -1,20 +1,29 @@
 import os
 import time
+from utils.rotation import RotatingFile
+from utils.log_pipeline import pipeline, format_time, STDOUT
 
 LOG_DIR = os.path.join(os.path.dirname(__file__), "logs")
 os.makedirs(LOG_DIR, exist_ok=True)
 DAEMON_LOG = os.path.join(LOG_DIR, "daemon.log")
+DAEMON_LOG_MAXBYTES = 10 * 1024 * 1024
+DAEMON_LOG_BACKUPS = 5
 
-def log_msg(message: str, level: str = "INFO") -> str:
-    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+# un seul fd ouvert, tourné par taille (stdout / stderr du daemon y sont attachés)
+daemon_log = RotatingFile(DAEMON_LOG, DAEMON_LOG_MAXBYTES, DAEMON_LOG_BACKUPS)
+
+def log_msg(message: str, level: str = "INFO", ts: float = None) -> str:
+    timestamp = format_time(time.time() if ts is None else ts)
     return f"[{timestamp}] [{level}] {message}"
 
+def _emit(ts, level, message, print_stdout):
+    line = log_msg(message, level, ts) + "\n"
+    if print_stdout:
+        return ((daemon_log, line), (STDOUT, line))
+    return ((daemon_log, line),)
+
 def log(message: str, level: str = "INFO", is_daemon: bool = False, print_stdout: bool = True):
     """Logger simple, seulement si is_daemon=True"""
     if not is_daemon:
         return
-    line = log_msg(message, level)
-    with open(DAEMON_LOG, "a+", buffering=1) as f:
-        f.write(line + "\n")
-    if print_stdout:
-        print(line, flush=True)
+    pipeline.submit(_emit, time.time(), level, message, print_stdout)
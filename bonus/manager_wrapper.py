@@ -1,28 +1,40 @@
 import os
-import threading
-import time
-import pwd
-import grp
 import json
-import fcntl
-import termios
 from process.manager import ProcessManager
+from process.spawn import SpawnError
+from process.output import OutputRing
 from utils.enums import ProcessState
 from bonus.logger import log
+from utils.rotation import RotatingFile
+from utils.log_pipeline import pipeline
 from bonus.webhook import send_webhook
+from bonus.coalesce import AlertCoalescer
 from bonus.pty_manager import PTYManager
 
 ALERT_FILE = os.path.join(os.path.dirname(__file__), "logs/alerts.log")
 os.makedirs(os.path.dirname(ALERT_FILE), exist_ok=True)
+alert_log = RotatingFile(ALERT_FILE)
+
+
+def _emit_alert(alert):
+    return ((alert_log, json.dumps(alert) + "\n"),)
 
 class ManagerWrapper:
     def __init__(self, config_path, is_daemon=False):
         self.manager = ProcessManager(config_path)
         self.disabled_programs = set()
-        self._child_threads = {}  # pid -> thread pour logs stdout/stderr
+        self.loop = None  # boucle asyncio du daemon
+        self._child_outputs = {}  # pid -> (programme, OutputRing), pipes encore ouverts
         self._exited_pids = set()
         self.is_daemon = is_daemon
         self.pty_manager = PTYManager()
+        # restarts / scaling du manager passent aussi par les pipes / pty
+        self.manager.instance_starter = self._spawn_instance
+        # alertes regroupées par (event, programme) et limitées par sink
+        self.alerts = AlertCoalescer(
+            {"file": self._alert_file, "log": self._alert_log, "webhook": send_webhook},
+            self.manager.timers,
+        )
 
     def log(self, message, level="INFO"):
         log(message, level, is_daemon=self.is_daemon)
@@ -30,15 +42,13 @@ class ManagerWrapper:
     def send_alert(self, event, payload):
         if not self.is_daemon:
             return
-        alert = {
-            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "event": event,
-            "payload": payload,
-        }
-        with open(ALERT_FILE, "a+", buffering=1) as f:
-            f.write(json.dumps(alert) + "\n")
-        self.log(f"[ALERT] {event} {payload}", level="WARNING")
-        send_webhook(alert)
+        self.alerts.add(event, payload)
+
+    def _alert_file(self, alert):
+        pipeline.submit(_emit_alert, alert)  # json.dumps dans le writer
+
+    def _alert_log(self, alert):
+        self.log(f"[ALERT] {alert['event']} {alert['payload']}", level="WARNING")
 
     # --- start / stop / reload / tail_child comme avant ---
     def start_program(self, name):
@@ -51,85 +61,93 @@ class ManagerWrapper:
             self.log(f"Program '{name}' not found")
             return
 
+        program.reset_breaker()
         for inst in program.processes:
-            if inst.state != ProcessState.STOPPED:
-                continue
+            if inst.can_start():
+                inst.crash_count = 0  # start manuel : backoff repart de zéro
+                self._spawn_instance(program, inst)
 
-            if program.config.attachable:
-                master_fd, slave_fd = self.pty_manager.create_pty()
-                pid = os.fork()
+    def _spawn_instance(self, program, inst):
+        name = program.config.name
+        if name in self.disabled_programs:
+            return
 
-                if pid == 0:
+        if program.config.attachable:
+            master_fd, slave_fd = self.pty_manager.create_pty()
+            try:
+                pid = program.spawn_plan.spawn(pty_slave=slave_fd)
+            except (OSError, SpawnError) as e:
+                self.log(f"PTY exec failed: {e}", level="ERROR")
+                os.close(master_fd)
+                inst.stop_reason = "spawn_error"
+                self.manager.emit("spawn_error", program, inst)
+                return
+            finally:
+                os.close(slave_fd)
+
+            self.manager.track_instance(program, inst, pid)
+            inst.pty_master_fd = master_fd
+            inst.is_attachable = True
+            self.pty_manager.register(pid, master_fd)
+            self.log(f"[Daemon] Started attachable '{name}' pid={pid}")
+        else:
+            # pipes stdout / stderr séparés, servis par le multiplexeur du manager
+            pipes = [os.pipe(), os.pipe()]
+            try:
+                pid = program.spawn_plan.spawn(fds={1: pipes[0][1], 2: pipes[1][1]})
+            except (OSError, SpawnError) as e:
+                self.log(f"Failed to exec {program.config.cmd}: {e}", level="ERROR")
+                for r, _ in pipes:
+                    os.close(r)
+                inst.stop_reason = "spawn_error"
+                self.manager.emit("spawn_error", program, inst)
+                return
+            finally:
+                for _, w in pipes:
+                    os.close(w)
+
+            self.manager.track_instance(program, inst, pid)
+            self.log(f"[Daemon] Started '{name}' with pid {pid}")
+
+            # flux avec fichier dans la config : splice vers le fichier, tourné
+            # à *_maxbytes ; les autres sont inspectés (ring buffer + log du daemon)
+            sinks = {}
+            config = program.config
+            for stream, path, maxbytes, backups in (
+                ("stdout", config.stdout, config.stdout_maxbytes, config.stdout_backups),
+                ("stderr", config.stderr, config.stderr_maxbytes, config.stderr_backups),
+            ):
+                if path:
                     try:
-                        os.setsid()
-                        fcntl.ioctl(slave_fd, termios.TIOCSCTTY, 0)
-                        os.dup2(slave_fd, 0)
-                        os.dup2(slave_fd, 1)
-                        os.dup2(slave_fd, 2)
-                        os.close(master_fd)
-                        os.close(slave_fd)
-
-                        if program.config.user:
-                            pw = pwd.getpwnam(program.config.user)
-                            os.setgid(pw.pw_gid)
-                            os.setuid(pw.pw_uid)
-
-                        os.execv("/bin/sh", ["sh", "-c", program.config.cmd])
-                    except Exception as e:
-                        print(f"PTY exec failed: {e}", flush=True)
-                        os._exit(1)
-                else:
-                    os.close(slave_fd)
-                    inst.mark_started(pid)
-                    inst.pty_master_fd = master_fd
-                    inst.is_attachable = True
-                    self.pty_manager.register(pid, master_fd)
-                    self.log(f"[Daemon] Started attachable '{name}' pid={pid}")
+                        sinks[stream] = self.manager.output.open_sink(
+                            path, maxbytes, backups, config.log_compress
+                        )
+                    except OSError as e:
+                        self.log(f"Cannot open {stream} file {path}: {e}", level="ERROR")
+
+            # ring buffer conservé d'un restart à l'autre (sortie du crash précédent)
+            if len(sinks) == 2:
+                inst.output = None
+            elif inst.output is None:
+                inst.output = OutputRing(program.config.output_buffer)
             else:
-                # 👇 ancien comportement pipe
-                r, w = os.pipe()
-                pid = os.fork()
-                if pid == 0:
-                    try:
-                        os.dup2(w, 1)
-                        os.dup2(w, 2)
-                        os.close(r)
-                        os.close(w)
-
-                        if program.config.user:
-                            try:
-                                pw = pwd.getpwnam(program.config.user)
-                                os.setgid(pw.pw_gid)
-                                os.setuid(pw.pw_uid)
-                            except KeyError:
-                                self.log(f"User '{program.config.user}' not found", level="ERROR")
-                                os._exit(1)
-                        os.execv("/bin/sh", ["sh", "-c", program.config.cmd])
-                    except Exception as e:
-                        print(f"Failed to exec {program.config.cmd}: {e}", flush=True)
-                        os._exit(1)
-                else:
-                    os.close(w)
-                    inst.mark_started(pid)
-                    self.log(f"[Daemon] Started '{name}' with pid {pid}")
-                    t = threading.Thread(target=self._tail_child, args=(pid, r, name), daemon=True)
-                    t.start()
-
-    def _tail_child(self, pid, fd, prog_name):
-        seen = set()
-        while True:
-            try:
-                data = os.read(fd, 1024)
-                if not data:
-                    break
-                for line in data.decode(errors="ignore").splitlines():
-                    if line.strip() not in seen:
-                        self.log(f"[Child {pid}] {line.strip()}")
-                        seen.add(line.strip())
-            except OSError:
-                break
-        os.close(fd)
-        # self.send_alert("process_exited", {"program": prog_name, "pid": pid})
+                inst.output.resize(program.config.output_buffer)
+            self._child_outputs[pid] = (name, inst.output)
+            self.manager.output.watch(
+                pid, {"stdout": pipes[0][0], "stderr": pipes[1][0]},
+                self._on_child_line, self._on_child_eof, sinks=sinks,
+            )
+
+    def _on_child_line(self, stream, data):
+        _, ring = self._child_outputs[stream.key]
+        ring.append(data)
+        line = data.decode(errors="replace").rstrip()
+        prefix = f"[Child {stream.key}]" if stream.name == "stdout" else f"[Child {stream.key} stderr]"
+        self.log(f"{prefix} {line}")
+
+    def _on_child_eof(self, pid):
+        # l'enfant a fermé stdout et stderr
+        prog_name, _ = self._child_outputs.pop(pid, (None, None))
         if pid not in self._exited_pids:
             self._exited_pids.add(pid)
             self.send_alert("process_exited", {"program": prog_name, "pid": pid})
@@ -139,25 +157,14 @@ class ManagerWrapper:
         program = self.manager.programs.get(name)
         if program:
             for inst in program.processes:
-                if inst.state == ProcessState.RUNNING and inst.pid:
+                if inst.state in (ProcessState.STARTING, ProcessState.RUNNING) and inst.pid:
                     self.send_alert("process_stopped", {"program": name, "pid": inst.pid})
         self.manager.stop_program(name)
 
-    def reload_config(self):
-        self.manager.reload_config()
-        for name, prog in self.manager.programs.items():
-            if name in self.disabled_programs:
-                self.log(f"[Bonus] '{name}' disabled, ignoring reload")
-                continue
-            desired = prog.config.numprocs
-            running = len([p for p in prog.processes if p.state == ProcessState.RUNNING])
-            if running < desired:
-                self.log(f"[Bonus] Increasing '{name}' {running} -> {desired}")
-                for _ in range(desired - running):
-                    self.start_program(name)
-            elif running > desired:
-                self.log(f"[Bonus] Decreasing '{name}' {running} -> {desired}")
-                self.manager.stop_program(name)
+    def reload_config(self, paths=None):
+        # reload incrémental : le manager ne relance / scale que ce qui a changé,
+        # les programmes désactivés sont filtrés par _spawn_instance
+        self.manager.reload_config(paths)
 
     def __getattr__(self, attr):
         return getattr(self.manager, attr)
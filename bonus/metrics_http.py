@@ -0,0 +1,63 @@
+import asyncio
+from logger import log
+
+METRICS_HOST = "127.0.0.1"  # local uniquement
+METRICS_PORT = 9108          # 0 désactive l'endpoint
+REQUEST_TIMEOUT = 5.0
+MAX_HEADERS = 100
+
+
+class MetricsServer:
+    """GET /metrics : métriques du Sampler au format texte Prometheus.
+
+    Servi par la boucle asyncio du daemon, comme le socket de contrôle ;
+    le texte est construit une fois par passe du sampler, pas par requête.
+    """
+
+    def __init__(self, sampler, host=METRICS_HOST, port=METRICS_PORT):
+        self.sampler = sampler
+        self.host = host
+        self.port = port
+        self.server = None
+
+    async def start(self):
+        if not self.port:
+            return
+        try:
+            self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        except OSError as e:
+            log(f"[Metrics] Cannot listen on {self.host}:{self.port}: {e}", level="WARNING")
+            return
+        log(f"[Metrics] Listening on http://{self.host}:{self.port}/metrics")
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                request = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+                if not request:
+                    break
+                for _ in range(MAX_HEADERS):
+                    if (await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)) in (b"\r\n", b"\n", b""):
+                        break
+                parts = request.split()
+                if len(parts) < 2 or parts[0] != b"GET":
+                    self.reply(writer, b"405 Method Not Allowed", b"text/plain", b"GET only\n")
+                elif parts[1].split(b"?")[0] == b"/metrics":
+                    self.reply(writer, b"200 OK", b"text/plain; version=0.0.4", self.sampler.exposition())
+                else:
+                    self.reply(writer, b"404 Not Found", b"text/plain", b"Not found\n")
+                await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def reply(self, writer, status, content_type, body):
+        writer.write(
+            b"HTTP/1.1 " + status + b"\r\nContent-Type: " + content_type +
+            b"\r\nContent-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+        )
+
+    def cleanup(self):
+        if self.server:
+            self.server.close()
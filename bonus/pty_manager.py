@@ -1,9 +1,6 @@
 import os
 import pty
-import tty
-import termios
-import select
-import threading
+import asyncio
 
 class PTYManager:
     def __init__(self):
@@ -17,58 +14,61 @@ class PTYManager:
     def register(self, pid, master_fd):
         self.sessions[pid] = master_fd
 
-    def attach(self, pid, client_socket):
+    async def attach(self, pid, reader, writer):
+        """Relie le client au PTY de l'instance, dans la boucle asyncio du daemon."""
         if pid not in self.sessions:
-            client_socket.sendall(b"Process not attachable\n")
+            writer.write(b"Process not attachable\n")
             return
 
         master_fd = self.sessions[pid]
+        loop = asyncio.get_running_loop()
+        eof = loop.create_future()
 
-        client_socket.sendall(b"Attached. Ctrl+X or type 'detach' to detach\n")
+        writer.write(b"Attached. Ctrl+X or type 'detach' to detach\n")
+        self.attached.add(pid)
 
-        def bridge():
+        def on_output():
             try:
-                buffer = b""
+                data = os.read(master_fd, 1024)
+            except OSError:
+                data = b""
+            if not data:
+                if not eof.done():
+                    eof.set_result(None)
+                return
+            writer.write(data)
 
-                while True:
-                    rlist, _, _ = select.select([client_socket, master_fd], [], [])
+        async def forward_input():
+            buffer = b""
+            while True:
+                data = await reader.read(1024)
+                if not data:
+                    return
 
-                    if client_socket in rlist:
-                        data = client_socket.recv(1024)
-                        if not data:
-                            break
+                buffer += data
 
-                        buffer += data
+                # --- DETACH via Ctrl+X ---
+                if b"\x18" in buffer:
+                    return
 
-                        # --- DETACH via Ctrl+X ---
-                        if b"\x18" in buffer:
-                            break
+                # --- DETACH via command ---
+                while b"\n" in buffer:
+                    line, buffer = buffer.split(b"\n", 1)
+                    if line.strip() == b"detach":
+                        return
+                    os.write(master_fd, line + b"\n")
 
-                        # --- DETACH via command ---
-                        if b"\n" in buffer:
-                            line, buffer = buffer.split(b"\n", 1)
-                            if line.strip() == b"detach":
-                                break
-                            os.write(master_fd, line + b"\n")
-                        continue
-
-                    if master_fd in rlist:
-                        data = os.read(master_fd, 1024)
-                        if not data:
-                            break
-                        client_socket.sendall(data)
-            except (BrokenPipeError, ConnectionResetError):
-                pass
+        loop.add_reader(master_fd, on_output)
+        input_task = asyncio.ensure_future(forward_input())
+        try:
+            await asyncio.wait([input_task, eof], return_when=asyncio.FIRST_COMPLETED)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            loop.remove_reader(master_fd)
+            input_task.cancel()
+            self.attached.discard(pid)
+            try:
+                writer.write(b"\nDetached.\n")
             except Exception:
                 pass
-            finally:
-                self.attached.discard(pid)
-                try:
-                    client_socket.sendall(b"\nDetached.\n")
-                except:
-                    pass
-                    
-        t = threading.Thread(target=bridge, daemon=True)
-        t.start()
-        # t.join()
-                    
\ No newline at end of file
@@ -1,89 +1,214 @@
 import sys
 import os
+import json
 
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, ROOT)
 
-from utils.enums import ProcessState
-
-def handle_command(manager, command: str) -> str:
-    parts = command.strip().split()
-    if not parts:
-        return "ERR empty command"
-
-    cmd = parts[0]
-
+from process import tail
+from process.journal import history
+from process.metrics import stats
+from bonus import webhook
+
+# Deux formats sur le même socket :
+#  - texte (historique) : une ligne de commande, la réponse, fermeture ;
+#  - NDJSON : une requête JSON par ligne {"id": 1, "cmd": "start", "args": ["a", "b"]},
+#    autant de requêtes que voulu sur la connexion (pipelining), traitées dans
+#    l'ordre. Réponse {"id": 1, "ok": true, "lines": [...], "data": ...} ; une
+#    grosse réponse part en morceaux {"id": 1, "more": true, "lines": [...]}
+#    suivis du message final (sans "more").
+CHUNK_LINES = 500
+
+# verbes acceptant plusieurs programmes (ou "all")
+BULK = {
+    "start": ("start_program", "started"),
+    "stop": ("stop_program", "stopped"),
+    "restart": ("restart_program", "restarted"),
+}
+
+
+# status de toute la flotte déjà formaté, pour la génération du snapshot
+_fleet_status = (-1, [], [])
+
+
+def _status_row(name, row):
+    state, running, desired, _, _ = row
+    return f"{name} {state} {running}/{desired}", \
+        {"name": name, "state": state, "running": running, "desired": desired}
+
+
+def status(manager, args):
+    """status [--gen N] [program...]
+
+    Avec --gen N (génération reçue au status précédent) : "not modified" si
+    rien n'a changé, sinon les lignes suivies de "OK generation=G".
+    """
+    global _fleet_status
+    seen = None
+    if args[:1] == ["--gen"]:
+        if len(args) < 2 or not args[1].lstrip("-").isdigit():
+            return False, ["ERR usage: status [--gen N] [program...]"], None
+        seen, args = int(args[1]), args[2:]
+
+    generation, rows = manager.snapshot()
+    if seen == generation:
+        return True, [f"OK not modified generation={generation}"], \
+            {"generation": generation, "modified": False}
+
+    ok = True
+    if args:
+        lines, data = [], []
+        for name in args:
+            prog = manager.programs.get(name)
+            if prog is None:
+                ok = False
+                lines.append(f"ERR unknown program {name}")
+                continue
+            line, item = _status_row(name, prog.status())
+            lines.append(line)
+            data.append(item)
+    else:
+        if _fleet_status[0] != generation:
+            rendered = [_status_row(name, row) for name, row in rows]
+            _fleet_status = (generation, [line for line, _ in rendered], [item for _, item in rendered])
+        _, lines, data = _fleet_status
+
+    if seen is not None:
+        return ok, lines + [f"OK generation={generation}"], \
+            {"generation": generation, "modified": True, "programs": data}
+    return ok, lines or ["OK no programs"], data
+
+
+def execute(manager, cmd, args):
+    """Exécute une commande -> (ok, lignes, data) ; data : valeur structurée pour --json."""
     if cmd == "status":
-        lines = []
-        for name, prog in manager.programs.items():
-            running = len([p for p in prog.processes if p.state == ProcessState.RUNNING])
-            desired = prog.config.numprocs
-            lines.append(f"{name} RUNNING {running}/{desired}")
-        return "\n".join(lines) if lines else "OK no programs"
-
-    elif cmd == "start":
-        if len(parts) != 2:
-            return "ERR usage: start <program>"
-        manager.start_program(parts[1])
-        return f"OK started {parts[1]}"
-
-    elif cmd == "stop":
-        if len(parts) != 2:
-            return "ERR usage: stop <program>"
-        manager.stop_program(parts[1])
-        return f"OK stopped {parts[1]}"
+        return status(manager, args)
+
+    elif cmd in BULK:
+        if not args:
+            return False, [f"ERR usage: {cmd} <program> [program...] | all"], None
+        method, done = BULK[cmd]
+        names = list(manager.programs) if args == ["all"] else args
+        lines, ok = [], True
+        for name in names:
+            if name not in manager.programs:
+                ok = False
+                lines.append(f"ERR unknown program {name}")
+                continue
+            getattr(manager, method)(name)
+            lines.append(f"OK {done} {name}")
+        return ok, lines, None
 
     elif cmd == "reload":
         manager.reload_config()
-        return "OK reload done"
+        return True, ["OK reload done"], None
+
+    elif cmd == "tail":
+        try:
+            target, n, _ = tail.parse_args(args)
+            sources = tail.resolve(manager.programs, target)
+        except ValueError as e:
+            return False, [f"ERR {e}"], None
+        lines = tail.Follower(sources).initial(n)
+        return True, lines or ["OK no output"], None
+
+    elif cmd == "history":
+        if manager.journal is None:
+            return False, ["ERR history disabled (journal unavailable)"], None
+        try:
+            return True, history(manager.journal, manager.programs, args), None
+        except ValueError as e:
+            return False, [f"ERR {e}"], None
+
+    elif cmd == "stats":
+        try:
+            lines, data = stats(manager.sampler, manager.programs, args)
+        except ValueError as e:
+            return False, [f"ERR {e}"], None
+        return True, lines, data
+
+    elif cmd == "alerts":
+        alerts = manager.alerts
+        counters = dict(alerts.stats, open_windows=len(alerts.groups))
+        counters.update((f"limited_{name}", n) for name, n in alerts.rate_limited.items())
+        return True, ["OK " + " ".join(f"{k}={v}" for k, v in counters.items())], counters
+
+    elif cmd == "webhook":
+        counters = webhook.stats()
+        return True, ["OK " + " ".join(f"{k}={v}" for k, v in counters.items())], counters
 
     elif cmd == "shutdown":
-        return "OK shutdown"
-
-    elif cmd.startswith("attach"):
-        parts = cmd.split()
-
-        if len(parts) != 2:
-            client_socket.sendall(b"Usage: attach <program[:index]>\n")
-            return
+        return True, ["OK shutdown"], None
 
-        target = parts[1]
-
-        # --- parse program:index ---
-        if ":" in target:
-            prog_name, idx = target.split(":", 1)
-            try:
-                index = int(idx)
-            except ValueError:
-                client_socket.sendall(b"Invalid instance index\n")
-                return
-        else:
-            prog_name = target
-            index = 0
+    elif cmd == "attach":
+        # attach prend la connexion en mode brut : géré par SocketServer
+        return False, ["ERR attach needs its own connection: client.py attach <program>"], None
 
-        program = manager.programs.get(prog_name)
+    elif cmd == "watch":
+        # flux poussé sur la connexion : géré par SocketServer
+        return False, ["ERR watch streams on its own connection: client.py watch [program...]"], None
 
-        if not program:
-            client_socket.sendall(b"Program not found\n")
-            return
+    return False, ["ERR unknown command"], None
 
-        if index >= len(program.processes):
-            client_socket.sendall(b"Instance index out of range\n")
-            return
 
-        inst = program.processes[index]
-
-        if inst.state != ProcessState.RUNNING:
-            client_socket.sendall(b"Instance not running\n")
-            return
-
-        if not getattr(inst, "is_attachable", False):
-            client_socket.sendall(b"Instance not attachable\n")
-            return
-
-        manager.pty_manager.attach(inst.pid, client_socket)
-        return
-
-    client_socket.sendall(b"No running attachable instance\n")
-
-    return "ERR unknown command"
+def handle_command(manager, command: str) -> str:
+    """Protocole texte : une ligne de commande -> réponse texte."""
+    parts = command.strip().split()
+    if not parts:
+        return "ERR empty command"
+    _, lines, _ = execute(manager, parts[0], parts[1:])
+    return "\n".join(lines)
+
+
+def parse_request(line):
+    """Ligne NDJSON -> (id, cmd, args) ; ValueError si la requête est invalide."""
+    try:
+        request = json.loads(line)
+    except ValueError:
+        raise ValueError("invalid JSON")
+    if not isinstance(request, dict):
+        raise ValueError("request must be an object")
+    cmd, args = request.get("cmd"), request.get("args", [])
+    if not isinstance(cmd, str) or not isinstance(args, list):
+        raise ValueError("expected {\"cmd\": str, \"args\": [str]}")
+    return request.get("id"), cmd, [str(a) for a in args]
+
+
+# dernière grosse réponse encodée (status de la flotte) : tant que le
+# snapshot ne change pas, execute() renvoie les mêmes listes
+_last_encoded = (None, None, None, [])
+
+
+def encode_response(request_id, ok, lines, data=None):
+    """Messages NDJSON (bytes) d'une réponse, découpée par CHUNK_LINES.
+
+    Les lignes, et data quand c'est une liste, sont découpées de la même
+    façon ; le client concatène les morceaux jusqu'au message sans "more".
+    """
+    global _last_encoded
+    cached_lines, cached_data, cached_ok, bodies = _last_encoded
+    if not (cached_lines is lines and cached_data is data and cached_ok == ok):
+        bodies = _encode_bodies(ok, lines, data)
+        if len(bodies) > 1:
+            _last_encoded = (lines, data, ok, bodies)
+    # seul le début du message dépend de la requête
+    prefix = b'{"id": ' + json.dumps(request_id).encode() + b", "
+    return [prefix + body for body in bodies]
+
+
+def _encode_bodies(ok, lines, data):
+    size = max(len(lines), len(data) if isinstance(data, list) else 0)
+    last = (size - 1) // CHUNK_LINES * CHUNK_LINES if size else 0
+    bodies = []
+    for start in range(0, last + 1, CHUNK_LINES):
+        message = {"lines": lines[start:start + CHUNK_LINES]}
+        if isinstance(data, list):
+            message["data"] = data[start:start + CHUNK_LINES]
+        if start < last:
+            message["more"] = True
+        else:
+            message["ok"] = ok
+            if data is not None and not isinstance(data, list):
+                message["data"] = data
+        bodies.append(json.dumps(message)[1:].encode() + b"\n")
+    return bodies
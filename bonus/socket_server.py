@@ -1,82 +1,239 @@
 import os
-import socket
-import threading
-from socket_protocol import handle_command
+import json
+import asyncio
+from socket_protocol import CHUNK_LINES, execute, parse_request, encode_response
 from logger import log
+from process import tail
+from bonus import webhook
+from bonus.watch import WatchHub
+from utils.log_pipeline import pipeline
 
 SOCKET_PATH = "/tmp/taskmaster.sock"
+FOLLOW_INTERVAL = 0.5  # tail -f : période de relecture des ring buffers
+MAX_REQUEST = 64 * 1024  # une ligne de commande plus longue est refusée
+REQUEST_TIMEOUT = 10.0   # client connecté qui n'envoie pas sa commande
+IDLE_TIMEOUT = 60.0      # NDJSON : connexion sans nouvelle requête, fermée
+SEND_TIMEOUT = 10.0      # client qui ne lit pas sa réponse
+MAX_CLIENTS = 512        # connexions simultanées (attach et tail -f compris)
+BACKLOG = 1024
+
+class SocketServer:
+    """Serveur de contrôle UNIX servi par la boucle asyncio du daemon.
+
+    Une tâche par client : un client lent (commande incomplète, réponse non
+    lue) n'occupe que sa tâche et finit coupé par REQUEST_TIMEOUT /
+    SEND_TIMEOUT ; attach et tail -f tournent à côté des autres commandes.
+    Une première ligne commençant par '{' passe la connexion en NDJSON
+    (voir socket_protocol) : plusieurs requêtes à la suite, réponses
+    envoyées par morceaux de CHUNK_LINES lignes.
+    `watch` garde la connexion et y pousse les transitions (WatchHub).
+    """
 
-class SocketServer(threading.Thread):
     def __init__(self, manager):
-        super().__init__(daemon=True)
         self.manager = manager
-        self.running = True
+        self.server = None
+        self.clients = 0
+        self.watchers = WatchHub()
+        manager.event_hooks.append(self.watchers.publish)
 
         if os.path.exists(SOCKET_PATH):
             os.remove(SOCKET_PATH)
 
-        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        self.server.bind(SOCKET_PATH)
-        self.server.listen(5)
-
+    async def start(self):
+        self.server = await asyncio.start_unix_server(
+            self.handle_client, path=SOCKET_PATH, limit=MAX_REQUEST, backlog=BACKLOG
+        )
         log("[Socket] Listening on /tmp/taskmaster.sock")
 
-    def run(self):
-        while self.running:
+    async def handle_client(self, reader, writer):
+        if self.clients >= MAX_CLIENTS:
+            writer.write(b"ERR too many clients\n")
+            writer.close()
+            return
+        self.clients += 1
+        try:
             try:
-                conn, _ = self.server.accept()
-
-                data = conn.recv(1024)
-                if not data:
-                    conn.close()
-                    continue
-
-                command = data.decode().strip()
-                log(f"[Socket] Command received: {command}")
-
-                # --- ATTACH ---
-                if command.startswith("attach"):
-                    parts = command.split()
-                    if len(parts) != 2:
-                        conn.sendall(b"ERR usage: attach <program>\n")
-                        conn.close()
-                        continue
-
-                    prog_name = parts[1]
-                    program = self.manager.programs.get(prog_name)
-
-                    if not program:
-                        conn.sendall(b"Program not found\n")
-                        conn.close()
-                        continue
-
-                    for inst in program.processes:
-                        if inst.state.name == "RUNNING" and getattr(inst, "is_attachable", False):
-                            self.manager.pty_manager.attach(inst.pid, conn)
-                            return
-
-                    conn.sendall(b"No running attachable instance\n")
-                    conn.close()
-                    continue
-
-                # --- COMMANDES NORMALES ---
-                response = handle_command(self.manager, command)
-                conn.sendall((response + "\n").encode())
-
-                if command.strip() == "shutdown":
-                    log("[Socket] Shutdown requested")
-                    self.running = False
-                    self.cleanup()
-                    os._exit(0)
-
-                conn.close()
-
-            except Exception as e:
-                log(f"[Socket] Error: {e}", level="ERROR")
+                data = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+            except asyncio.TimeoutError:
+                writer.write(b"ERR timeout waiting for command\n")
+                return
+            except ValueError:
+                # ligne au-delà de MAX_REQUEST (LimitOverrunError)
+                writer.write(b"ERR request too large\n")
+                return
+            if not data:
+                return
+
+            if data.lstrip().startswith(b"{"):
+                await self.serve_json(data, reader, writer)
+                return
+
+            command = data.decode().strip()
+            log(f"[Socket] Command received: {command}")
+
+            # --- ATTACH ---
+            if command.startswith("attach"):
+                parts = command.split()
+                if len(parts) != 2:
+                    writer.write(b"ERR usage: attach <program>\n")
+                    return
+
+                prog_name = parts[1]
+                program = self.manager.programs.get(prog_name)
+
+                if not program:
+                    writer.write(b"Program not found\n")
+                    return
+
+                for inst in program.processes:
+                    if inst.state.name in ("STARTING", "RUNNING") and getattr(inst, "is_attachable", False):
+                        await self.manager.pty_manager.attach(inst.pid, reader, writer)
+                        return
+
+                writer.write(b"No running attachable instance\n")
+                return
+
+            # --- TAIL -F : flux jusqu'à la déconnexion du client ---
+            parts = command.split()
+            if parts and parts[0] == "tail" and "-f" in parts:
+                await self.follow(parts[1:], reader, writer)
+                return
+
+            # --- WATCH : transitions poussées jusqu'à la déconnexion ---
+            if parts and parts[0] == "watch":
+                await self.watch(parts[1:], reader, writer)
+                return
+
+            # --- COMMANDES NORMALES (protocole texte) ---
+            if not parts:
+                writer.write(b"ERR empty command\n")
+                return
+            _, lines, _ = execute(self.manager, parts[0], parts[1:])
+            for start in range(0, len(lines), CHUNK_LINES):
+                writer.write(("\n".join(lines[start:start + CHUNK_LINES]) + "\n").encode())
+                await self.drain(writer)
+
+            if parts == ["shutdown"]:
+                await self.shutdown(writer)
+
+        except Exception as e:
+            log(f"[Socket] Error: {e}", level="ERROR")
+        finally:
+            self.clients -= 1
+            try:
+                await self.drain(writer)
+                writer.close()
+            except Exception:
+                writer.transport.abort()
+
+    async def serve_json(self, line, reader, writer):
+        """NDJSON : requêtes traitées dans l'ordre jusqu'à EOF ou IDLE_TIMEOUT."""
+        while line:
+            try:
+                request_id, cmd, args = parse_request(line)
+            except ValueError as e:
+                cmd = None
+                messages = encode_response(None, False, [f"ERR {e}"])
+            else:
+                log(f"[Socket] Command received: {' '.join([cmd] + args)}")
+                if cmd == "watch":
+                    # la connexion passe en flux : plus de requêtes après
+                    await self.watch(args, reader, writer, request_id, json_mode=True)
+                    return
+                ok, lines, data = execute(self.manager, cmd, args)
+                messages = encode_response(request_id, ok, lines, data)
+            # drain entre les morceaux : un client qui lit lentement un gros
+            # status ne fait pas gonfler le buffer d'écriture
+            for message in messages:
+                writer.write(message)
+                await self.drain(writer)
+            if cmd == "shutdown":
+                await self.shutdown(writer)
+            try:
+                line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                return
+            except ValueError:
+                writer.write(encode_response(None, False, ["ERR request too large"])[0])
+                return
+
+    async def shutdown(self, writer):
+        log("[Socket] Shutdown requested")
+        await self.drain(writer)
+        self.cleanup()
+        # os._exit saute atexit : résumés d'alertes, webhooks et logs
+        # en attente sont vidés ici
+        self.manager.alerts.flush()
+        webhook.delivery.flush()
+        pipeline.flush()
+        os._exit(0)
+
+    async def drain(self, writer):
+        """drain() borné : un client qui ne lit plus est coupé (TimeoutError)."""
+        if writer.transport.get_write_buffer_size():
+            await asyncio.wait_for(writer.drain(), SEND_TIMEOUT)
+
+    async def follow(self, args, reader, writer):
+        try:
+            target, n, _ = tail.parse_args(args)
+            sources = tail.resolve(self.manager.programs, target)
+        except ValueError as e:
+            writer.write(f"ERR {e}\n".encode())
+            return
+
+        follower = tail.Follower(sources)
+        # toute donnée ou EOF côté client termine le suivi
+        closed = asyncio.ensure_future(reader.read())
+        lines = follower.initial(n)
+        try:
+            while True:
+                if lines:
+                    writer.write(("\n".join(lines) + "\n").encode())
+                    await self.drain(writer)
+                done, _ = await asyncio.wait({closed}, timeout=FOLLOW_INTERVAL)
+                if done:
+                    break
+                lines = follower.poll()
+        finally:
+            closed.cancel()
+
+    async def watch(self, names, reader, writer, request_id=None, json_mode=False):
+        unknown = [name for name in names if name not in self.manager.programs]
+        if unknown:
+            lines = [f"ERR unknown program {name}" for name in unknown]
+            if json_mode:
+                writer.write(encode_response(request_id, False, lines)[0])
+            else:
+                writer.write(("\n".join(lines) + "\n").encode())
+            return
+
+        sub = self.watchers.subscribe(names or None, request_id, json_mode)
+        line = "OK watching " + (" ".join(names) if names else "all")
+        if json_mode:
+            writer.write(sub.prefix + json.dumps({"more": True, "lines": [line]})[1:].encode() + b"\n")
+        else:
+            writer.write((line + "\n").encode())
+        # toute donnée ou EOF côté client termine le suivi
+        closed = asyncio.ensure_future(reader.read())
+        ready = None
+        try:
+            while True:
+                ready = asyncio.ensure_future(sub.ready.wait())
+                done, _ = await asyncio.wait({closed, ready}, return_when=asyncio.FIRST_COMPLETED)
+                if closed in done:
+                    break
+                writer.write(sub.take())
+                await self.drain(writer)
+        finally:
+            self.watchers.unsubscribe(sub)
+            closed.cancel()
+            if ready is not None:
+                ready.cancel()
 
     def cleanup(self):
         try:
-            self.server.close()
+            if self.server:
+                self.server.close()
             os.remove(SOCKET_PATH)
         except Exception:
             pass
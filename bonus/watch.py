@@ -0,0 +1,104 @@
+import json
+import time
+import asyncio
+from collections import deque
+
+WATCH_QUEUE = 10000  # événements en attente par abonné ; au-delà, les plus anciens sont jetés
+
+
+class Subscriber:
+    """Un client `watch` : file bornée d'événements déjà encodés."""
+
+    __slots__ = ("names", "prefix", "pending", "dropped", "ready")
+
+    def __init__(self, names, request_id=None, json_mode=False):
+        self.names = names  # None : tous les programmes
+        # NDJSON : seul le début du message ({"id": ...) dépend de l'abonné
+        self.prefix = b'{"id": ' + json.dumps(request_id).encode() + b", " if json_mode else None
+        self.pending = deque()
+        self.dropped = 0
+        self.ready = asyncio.Event()
+
+    def push(self, text, body):
+        if len(self.pending) >= WATCH_QUEUE:
+            self.pending.popleft()
+            self.dropped += 1
+        self.pending.append(body if self.prefix is not None else text)
+        self.ready.set()
+
+    def take(self):
+        """Tout ce qui est en attente, prêt à écrire sur le socket."""
+        frames, self.pending = self.pending, deque()
+        self.ready.clear()
+        if self.prefix is not None:
+            data = b"".join(self.prefix + body for body in frames)
+        else:
+            data = b"".join(frames)
+        if self.dropped:
+            line = f"WARN dropped {self.dropped} events (client too slow)"
+            if self.prefix is not None:
+                notice = json.dumps({"more": True, "lines": [line], "dropped": self.dropped})
+                notice = self.prefix + notice[1:].encode() + b"\n"
+            else:
+                notice = (line + "\n").encode()
+            data = notice + data
+            self.dropped = 0
+        return data
+
+
+class WatchHub:
+    """Diffusion des transitions d'instances aux clients `watch`.
+
+    Hook du manager (ProcessManager.event_hooks) : chaque événement est
+    encodé une seule fois puis ajouté à la file des abonnés concernés. Un
+    événement sur un programme que personne ne suit ne coûte qu'une
+    recherche dans un dict ; le coût ne dépend ni du nombre de programmes
+    ni du nombre de clients qui ne le suivent pas.
+    """
+
+    def __init__(self):
+        self.by_program = {}  # nom -> set(Subscriber)
+        self.everything = set()
+
+    def subscribe(self, names=None, request_id=None, json_mode=False):
+        sub = Subscriber(names, request_id, json_mode)
+        if names is None:
+            self.everything.add(sub)
+        else:
+            for name in names:
+                self.by_program.setdefault(name, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        if sub.names is None:
+            self.everything.discard(sub)
+            return
+        for name in sub.names:
+            subs = self.by_program.get(name)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self.by_program[name]
+
+    def publish(self, event, program, inst, info):
+        name = program.config.name
+        subs = self.by_program.get(name)
+        if not subs and not self.everything:
+            return
+        index = inst.index
+        delta = {
+            "ts": time.time(), "event": event, "program": name, "instance": index,
+            "pid": info.get("pid", inst.pid), "state": inst.state.name,
+        }
+        delta.update(info)
+        line = f"{time.strftime('%H:%M:%S', time.localtime(delta['ts']))} {name}:{index} {event} {delta['state']}"
+        line += "".join(
+            f" {k}={v}" for k, v in delta.items()
+            if v is not None and k not in ("ts", "event", "program", "instance", "state")
+        )
+        text = (line + "\n").encode()
+        body = json.dumps({"more": True, "lines": [line], "data": [delta]})[1:].encode() + b"\n"
+        for sub in self.everything:
+            sub.push(text, body)
+        for sub in subs or ():
+            sub.push(text, body)
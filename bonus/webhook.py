@@ -1,16 +1,144 @@
+import os
 import json
-import urllib.request
+import time
+import atexit
+import random
+import threading
+import http.client
+from collections import deque
+from urllib.parse import urlsplit
 
 WEBHOOK_URL = "http://localhost:8080/webhook"
+QUEUE_SIZE = 1000      # au-delà, les alertes les plus anciennes sont jetées
+BATCH_MAX = 50         # alertes max par POST (tableau JSON)
+TIMEOUT = 2.0
+RETRY_BASE = 0.5       # backoff exponentiel entre deux tentatives d'un même lot
+RETRY_MAX = 30.0
+MAX_ATTEMPTS = 5       # puis le lot est abandonné (compté dans failed)
+EXIT_FLUSH_TIMEOUT = 2.0
+
+
+class WebhookDelivery:
+    """Envoi des alertes par un thread dédié, jamais depuis la boucle du daemon.
+
+    submit() empile l'alerte dans une file bornée et rend la main. Le worker
+    garde une connexion HTTP keep-alive ; s'il y a plusieurs alertes en
+    attente, elles partent dans un seul POST (tableau JSON), une alerte seule
+    part telle quelle (objet JSON). Échec réseau ou 5xx : nouvel essai avec
+    backoff, jusqu'à MAX_ATTEMPTS. 4xx : lot abandonné.
+    stats : sent / dropped (file pleine) / retried / failed (lots abandonnés).
+    """
+
+    def __init__(self, url=WEBHOOK_URL, queue_size=QUEUE_SIZE, batch_max=BATCH_MAX):
+        parts = urlsplit(url)
+        self.https = parts.scheme == "https"
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port
+        self.path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self.queue_size = queue_size
+        self.batch_max = batch_max
+        self.pending = deque()
+        self.cond = threading.Condition()
+        self.inflight = 0
+        self.conn = None
+        self.stats = {"sent": 0, "dropped": 0, "retried": 0, "failed": 0, "posts": 0}
+        self._pid = None
+
+    def submit(self, event):
+        with self.cond:
+            if self._pid != os.getpid():
+                # premier envoi, ou fork (daemonize) : nouveau worker
+                self._pid = os.getpid()
+                self.pending.clear()
+                self.inflight = 0
+                self.conn = None
+                threading.Thread(target=self._run, name="webhook", daemon=True).start()
+            if len(self.pending) >= self.queue_size:
+                self.pending.popleft()
+                self.stats["dropped"] += 1
+            self.pending.append(event)
+            self.cond.notify()
+
+    def queued(self):
+        return len(self.pending) + self.inflight
+
+    def flush(self, timeout=EXIT_FLUSH_TIMEOUT):
+        """Attend (au plus timeout) que la file soit vide."""
+        if self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        with self.cond:
+            while self.pending or self.inflight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                self.cond.wait(remaining)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+                batch = [self.pending.popleft() for _ in range(min(len(self.pending), self.batch_max))]
+                self.inflight = len(batch)
+            self._deliver(batch)
+            with self.cond:
+                self.inflight = 0
+                self.cond.notify_all()
+
+    def _deliver(self, batch):
+        body = json.dumps(batch[0] if len(batch) == 1 else batch).encode()
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                status = self._post(body)
+            except (OSError, http.client.HTTPException):
+                status = None
+            if status is not None and status < 500:
+                if status < 300:
+                    self.stats["sent"] += len(batch)
+                else:
+                    self.stats["failed"] += len(batch)  # refusé : inutile d'insister
+                return
+            if attempt < MAX_ATTEMPTS:
+                self.stats["retried"] += 1
+                delay = min(RETRY_BASE * 2 ** (attempt - 1), RETRY_MAX)
+                time.sleep(delay * random.uniform(0.8, 1.2))
+        self.stats["failed"] += len(batch)
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=TIMEOUT)
+
+    def _post(self, body):
+        # connexion keep-alive réutilisée : si le serveur l'a fermée entre
+        # deux alertes, un essai immédiat sur une connexion neuve
+        for reused in (self.conn is not None, False):
+            if self.conn is None:
+                self.conn = self._connect()
+            try:
+                self.conn.request("POST", self.path, body, {"Content-Type": "application/json"})
+                response = self.conn.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                self.conn.close()
+                self.conn = None
+                if reused:
+                    continue
+                raise
+            self.stats["posts"] += 1
+            if response.will_close:
+                self.conn.close()
+                self.conn = None
+            return response.status
+
+
+delivery = WebhookDelivery()
+atexit.register(delivery.flush)
+
 
 def send_webhook(event: dict):
-    try:
-        req = urllib.request.Request(
-            WEBHOOK_URL,
-            data=json.dumps(event).encode(),
-            headers={"Content-Type": "application/json"},
-            method="POST",
-        )
-        urllib.request.urlopen(req, timeout=1)
-    except Exception:
-        pass
+    delivery.submit(event)
+
+
+def stats():
+    return dict(delivery.stats, queued=delivery.queued())
@@ -1,64 +1,191 @@
 import json
+import time
 import threading
+from collections import deque
+from itertools import islice
+from urllib.parse import urlsplit, parse_qs
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from socketserver import ThreadingMixIn
 
-# Stockage en mémoire des alertes pour affichage navigateur
-ALERTS = []
+MAX_ALERTS = 1000      # alertes gardées en mémoire (les plus anciennes sortent)
+REPLAY = 50            # alertes rejouées à la connexion d'un onglet
+KEEPALIVE = 15.0       # commentaire SSE envoyé si rien de neuf (proxies, onglets morts)
+QUERY_LIMIT = 200
+PUSH_INTERVAL = 0.2    # un onglet reçoit au plus 5 envois/s, quel que soit le débit d'alertes
+
+# (seq, alerte, trame SSE déjà encodée) : chaque alerte est sérialisée une
+# seule fois, quel que soit le nombre d'onglets ouverts
+ALERTS = deque(maxlen=MAX_ALERTS)
+NEW_ALERT = threading.Condition()
+LAST_SEQ = 0
+
+
+def store(alerts):
+    """Ajoute les alertes d'un POST et réveille les onglets une seule fois."""
+    global LAST_SEQ
+    with NEW_ALERT:
+        for alert in alerts:
+            LAST_SEQ += 1
+            frame = f"id: {LAST_SEQ}\ndata: {json.dumps(alert)}\n\n".encode()
+            ALERTS.append((LAST_SEQ, alert, frame))
+        NEW_ALERT.notify_all()
+
+
+def since(seq):
+    """Entrées (seq, alerte, trame) postérieures à seq encore en mémoire."""
+    with NEW_ALERT:
+        missed = min(LAST_SEQ - seq, len(ALERTS))
+        entries = list(islice(reversed(ALERTS), max(missed, 0)))
+    entries.reverse()
+    return entries
+
+
+def matches(alert, filters):
+    payload = alert.get("payload") or {}
+    if "event" in filters and alert.get("event") not in filters["event"]:
+        return False
+    if "program" in filters and payload.get("program") not in filters["program"]:
+        return False
+    return True
+
+
+# page statique : construite une fois, les alertes arrivent par /events
+PAGE = b"""<!DOCTYPE html>
+<html>
+<head>
+    <title>TaskMaster Alerts</title>
+    <style>
+        body { font-family: monospace; background: #111; color: #eee; }
+        li.start { color: #0f0; }
+        li.stop { color: #f00; }
+        li.exit { color: #ff0; }
+        ul { list-style-type: none; padding: 0; }
+    </style>
+</head>
+<body>
+    <h1>TaskMaster Alerts (latest 50)</h1>
+    <ul id="alerts"></ul>
+    <script>
+        const list = document.getElementById("alerts");
+        const source = new EventSource("/events" + location.search);
+        source.onmessage = (msg) => {
+            const alert = JSON.parse(msg.data);
+            const event = alert.event || "";
+            const li = document.createElement("li");
+            li.className = event.includes("started") ? "start"
+                : event.includes("stopped") ? "stop"
+                : event.includes("exited") ? "exit" : "";
+            li.textContent = msg.data;
+            list.prepend(li);
+            while (list.childElementCount > 50) list.lastChild.remove();
+        };
+    </script>
+</body>
+</html>
+"""
+
 
 class WebhookHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive : TaskMaster réutilise sa connexion
+
     def do_POST(self):
         length = int(self.headers.get("content-length", 0))
         body = self.rfile.read(length)
         try:
-            alert = json.loads(body)
-            ALERTS.append(alert)
-            print(f"📩 WEBHOOK RECEIVED: {alert}")
+            alerts = json.loads(body)
+            # plusieurs alertes en attente : un seul POST avec un tableau
+            alerts = alerts if isinstance(alerts, list) else [alerts]
+            store(alerts)
+            for alert in alerts:
+                print(f"📩 WEBHOOK RECEIVED: {alert}")
         except Exception:
             print(f"⚠️ Malformed webhook: {body.decode()}")
         self.send_response(200)
+        self.send_header("Content-Length", "2")
         self.end_headers()
         self.wfile.write(b"OK")
 
     def do_GET(self):
-        self.send_response(200)
-        self.send_header("Content-Type", "text/html")
+        url = urlsplit(self.path)
+        filters = parse_qs(url.query)
+        if url.path == "/events":
+            self.stream(filters)
+        elif url.path == "/alerts":
+            self.query(filters)
+        elif url.path in ("/", "/index.html"):
+            self.reply(200, "text/html", PAGE)
+        else:
+            self.reply(404, "text/plain", b"Not found")
+
+    def reply(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
         self.end_headers()
+        self.wfile.write(body)
+
+    def query(self, filters):
+        """GET /alerts?event=process_exited&program=web&since=<seq>&limit=N -> JSON."""
+        try:
+            after = int(filters.get("since", ["0"])[0])
+            limit = min(int(filters.get("limit", [str(QUERY_LIMIT)])[0]), MAX_ALERTS)
+        except ValueError:
+            self.reply(400, "text/plain", b"since / limit must be integers")
+            return
+        found = [
+            {"seq": seq, **alert} for seq, alert, _ in since(after) if matches(alert, filters)
+        ]
+        self.reply(200, "application/json", json.dumps(found[-limit:] if limit > 0 else []).encode())
 
-        # page HTML simple + auto-refresh toutes les 2s
-        html = """
-        <html>
-        <head>
-            <title>TaskMaster Alerts</title>
-            <meta http-equiv="refresh" content="2">
-            <style>
-                body { font-family: monospace; background: #111; color: #eee; }
-                li.start { color: #0f0; }
-                li.stop { color: #f00; }
-                li.exit { color: #ff0; }
-                ul { list-style-type: none; padding: 0; }
-            </style>
-        </head>
-        <body>
-            <h1>TaskMaster Alerts (latest 50)</h1>
-            <ul>
-        """
-        for a in ALERTS[-50:]:
-            event = a.get("event", "")
-            cls = "start" if "started" in event else "stop" if "stopped" in event else "exit" if "exited" in event else ""
-            html += f"<li class='{cls}'>{json.dumps(a)}</li>"
-        html += "</ul></body></html>"
+    def stream(self, filters):
+        """GET /events : Server-Sent Events, seules les nouvelles alertes sont poussées."""
+        last = self.headers.get("Last-Event-ID")
+        if last is not None:
+            # reconnexion automatique du navigateur : on reprend après last
+            try:
+                last = int(last)
+            except ValueError:
+                self.reply(400, "text/plain", b"Last-Event-ID must be an integer")
+                return
+        with NEW_ALERT:
+            # un id venu d'un daemon précédent (ou forgé) au-delà de LAST_SEQ
+            # est ramené au dernier seq connu
+            seq = max(LAST_SEQ - REPLAY, 0) if last is None else max(min(last, LAST_SEQ), 0)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
         try:
-            self.wfile.write(html.encode())
-        except BrokenPipeError:
+            while True:
+                entries = since(seq)
+                if entries:
+                    seq = entries[-1][0]
+                    frames = b"".join(f for _, alert, f in entries if not filters or matches(alert, filters))
+                    if frames:
+                        self.wfile.write(frames)
+                        self.wfile.flush()
+                    # rafale : on laisse les alertes s'accumuler avant le prochain envoi
+                    time.sleep(PUSH_INTERVAL)
+                # pas d'écriture sous le verrou : un onglet lent ne bloque pas les POST
+                with NEW_ALERT:
+                    idle = LAST_SEQ <= seq and not NEW_ALERT.wait(KEEPALIVE)
+                if idle:
+                    self.wfile.write(b": keepalive\n\n")
+                    self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
             pass
 
     def log_message(self, format, *args):
         return  # silence logs HTTP par défaut
 
+
 class ThreadedHTTPServer(ThreadingMixIn, HTTPServer):
     daemon_threads = True
 
+
 if __name__ == "__main__":
     PORT = 8080
     print(f"🌐 Webhook browser server listening on http://localhost:{PORT}")
@@ -2,17 +2,24 @@ from http.server import BaseHTTPRequestHandler, HTTPServer
 import json
 
 class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive : TaskMaster réutilise sa connexion
+
     def do_POST(self):
         length = int(self.headers.get("Content-Length", 0))
         body = self.rfile.read(length).decode()
 
-        print("\n📩 WEBHOOK RECEIVED")
         try:
-            print(json.dumps(json.loads(body), indent=2))
+            alerts = json.loads(body)
+            # plusieurs alertes en attente : un seul POST avec un tableau
+            for alert in alerts if isinstance(alerts, list) else [alerts]:
+                print("\n📩 WEBHOOK RECEIVED")
+                print(json.dumps(alert, indent=2))
         except Exception:
+            print("\n📩 WEBHOOK RECEIVED")
             print(body)
 
         self.send_response(200)
+        self.send_header("Content-Length", "2")
         self.end_headers()
         self.wfile.write(b"OK")
 
@@ -1,46 +1,287 @@
+import os
+import glob
+import json
+import signal
+import hashlib
 import yaml
 from config.program_config import ProgramConfig
 from process.program import Program
+from utils.private_dir import PRIVATE_DIR, private_dir
+
+# Loader C (libyaml) si disponible, sinon le SafeLoader pur Python
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+CACHE_DIR = PRIVATE_DIR  # cache privé par utilisateur, vérifié par private_dir()
+CACHE_VERSION = 6  # à incrémenter si ProgramConfig ou la validation change
+
+KNOWN_KEYS = {
+    "cmd", "user", "numprocs", "autostart", "autorestart", "exitcodes",
+    "startretries", "starttime", "stopsignal", "stoptime", "stdout", "stderr",
+    "env", "workingdir", "umask", "attachable", "priority", "depends_on",
+    "backoff_base", "backoff_max", "backoff_jitter", "crash_window", "crash_threshold",
+    "output_buffer", "stdout_maxbytes", "stdout_backups", "stderr_maxbytes",
+    "stderr_backups", "log_compress", "rlimit_as", "rlimit_nofile", "rlimit_cpu",
+    "rlimit_nproc", "rss_limit",
+}
+# Noms alternatifs acceptés (supervisord)
+ALIASES = {"startsecs": "starttime"}
+AUTORESTART_VALUES = ("never", "always", "unexpected")
+COMPRESS_VALUES = ("gzip", "xz", "none")
+SIZE_UNITS = {"KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+
+
+class ConfigError(Exception):
+    pass
+
+
+# Mémo en process : path -> (clé stat, (configs, includes))
+_memo = {}
+
 
 class ConfigLoader:
     def __init__(self, path: str):
         self.path = path
+        self.files = []
+        self.includes = []
 
     def load(self):
-        with open(self.path, "r") as f:
-            data = yaml.safe_load(f)
+        return [Program(config) for config in self.load_configs()]
+
+    def load_configs(self):
+        """Liste de ProgramConfig validées et figées.
+
+        Le fichier principal peut inclure d'autres fichiers (`include:`, globs
+        relatifs à son dossier) ; chaque fichier est compilé et mis en cache
+        séparément. Après l'appel, self.files liste les fichiers chargés et
+        self.includes les globs absolus (pour le watcher).
+        """
+        main = os.path.abspath(self.path)
+        configs, includes = self._load_file(main, allow_include=True)
+        base = os.path.dirname(main)
+        self.includes = [os.path.join(base, os.path.expanduser(p)) for p in includes]
+        self.files = [main]
+
+        configs = list(configs)
+        seen = {main}
+        for pattern in self.includes:
+            for path in sorted(glob.glob(pattern)):
+                path = os.path.abspath(path)
+                if path in seen or not os.path.isfile(path):
+                    continue
+                seen.add(path)
+                self.files.append(path)
+                configs.extend(self._load_file(path, allow_include=False)[0])
+
+        sources = {}
+        for config in configs:
+            if config.name in sources:
+                raise ConfigError(
+                    f"program '{config.name}' defined in both {sources[config.name]} and {config.source}"
+                )
+            sources[config.name] = config.source
+        return configs
+
+    def _load_file(self, path, allow_include):
+        """(configs, includes) d'un fichier.
+
+        Fichier inchangé (même stat) : servi depuis le mémo sans lecture.
+        Contenu déjà compilé (même hash) : servi depuis le cache disque.
+        Sinon : parsing YAML + validation, puis mise en cache.
+        """
+        try:
+            cached = _memo.get(path)
+            if cached and cached[0] == self._stat_key(os.stat(path)):
+                return cached[1]
+            with open(path, "rb") as f:
+                stat_key = self._stat_key(os.fstat(f.fileno()))
+                raw = f.read()
+        except OSError as e:
+            raise ConfigError(f"Cannot read {path}: {e}")
+
+        # le chemin fait partie de la clé : les configs portent leur source
+        digest = hashlib.blake2b(raw, digest_size=16)
+        digest.update(f"{CACHE_VERSION}:{allow_include}:{path}".encode())
+        cache_dir = private_dir(CACHE_DIR)  # None : cache désactivé
+        cache_path = cache_dir and os.path.join(cache_dir, digest.hexdigest() + ".json")
+
+        compiled = self._read_cache(cache_path) if cache_path else None
+        if compiled is None:
+            compiled = self._compile(path, raw, allow_include)
+            if cache_path:
+                self._write_cache(cache_path, compiled)
+
+        _memo[path] = (stat_key, compiled)
+        return compiled
+
+    @staticmethod
+    def _stat_key(st):
+        return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
 
-        programs = []
+    def _read_cache(self, cache_path):
+        # JSON de dicts simples : un fichier de cache ne peut pas exécuter de code
+        try:
+            with open(cache_path, "rb") as f:
+                data = json.load(f)
+            configs = [
+                ProgramConfig(**{field: entry[field] for field in ProgramConfig.FIELDS},
+                              source=entry["source"])
+                for entry in data["configs"]
+            ]
+            includes = data["includes"]
+        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+            return None
+        if not isinstance(includes, list) or not all(isinstance(p, str) for p in includes):
+            return None
+        return configs, includes
+
+    def _write_cache(self, cache_path, compiled):
+        # best effort : un cache non écrivable ne doit pas empêcher de démarrer
+        configs, includes = compiled
+        data = {
+            "configs": [dict(config.as_dict(), source=config.source) for config in configs],
+            "includes": includes,
+        }
+        try:
+            tmp = f"{cache_path}.{os.getpid()}.tmp"
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_NOFOLLOW, 0o600)
+            with open(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, cache_path)
+        except (OSError, TypeError, ValueError):
+            pass
+
+    def _compile(self, path, raw, allow_include):
+        try:
+            data = yaml.load(raw, Loader=SafeLoader)
+        except yaml.YAMLError as e:
+            raise ConfigError(f"{path}: invalid YAML: {e}")
+
+        if data is None:
+            data = {}
+        if not isinstance(data, dict):
+            raise ConfigError(f"{path}: top level must be a mapping")
+        allowed = {"programs", "include"} if allow_include else {"programs"}
+        unknown = set(data) - allowed
+        if unknown:
+            raise ConfigError(f"{path}: unknown top-level keys: {', '.join(sorted(map(str, unknown)))}")
+
+        programs = data.get("programs") or {}
+        if not isinstance(programs, dict):
+            raise ConfigError(f"{path}: 'programs' must be a mapping")
+
+        configs = [self._compile_program(path, str(name), cfg) for name, cfg in programs.items()]
+        return configs, self._parse_include(path, data.get("include"))
+
+    def _parse_include(self, path, include):
+        if include is None:
+            return []
+
+        # YAML: include: conf.d/*.yaml
+        if isinstance(include, str):
+            return [include]
 
-        for name, cfg in data.get("programs", {}).items():
-            program_cfg = ProgramConfig(
+        # YAML: include: [conf.d/*.yaml, extra/*.yaml]
+        if isinstance(include, list) and all(isinstance(p, str) for p in include):
+            return include
+
+        raise ConfigError(f"{path}: 'include' must be a glob or a list of globs")
+
+    def _compile_program(self, path, name, cfg):
+        where = f"{path}: program '{name}'"
+        if not isinstance(cfg, dict):
+            raise ConfigError(f"{where}: must be a mapping")
+
+        cfg = dict(cfg)
+        for alias, key in ALIASES.items():
+            if alias in cfg:
+                if key in cfg:
+                    raise ConfigError(f"{where}: both '{alias}' and '{key}' are set")
+                cfg[key] = cfg.pop(alias)
+
+        unknown = set(cfg) - KNOWN_KEYS
+        if unknown:
+            raise ConfigError(f"{where}: unknown keys: {', '.join(sorted(map(str, unknown)))}")
+        if not isinstance(cfg.get("cmd"), str) or not cfg["cmd"].strip():
+            raise ConfigError(f"{where}: 'cmd' is required")
+        if cfg.get("autorestart", "never") not in AUTORESTART_VALUES:
+            raise ConfigError(f"{where}: autorestart must be one of {', '.join(AUTORESTART_VALUES)}")
+        if cfg.get("log_compress", "gzip") not in COMPRESS_VALUES:
+            raise ConfigError(f"{where}: log_compress must be one of {', '.join(COMPRESS_VALUES)}")
+
+        try:
+            return ProgramConfig(
                 name=name,
                 cmd=cfg["cmd"],
                 user=cfg.get("user"),
-                numprocs=cfg.get("numprocs", 1),
-                autostart=cfg.get("autostart", False),
+                numprocs=self._parse_number(cfg, "numprocs", 1, int, minimum=0),
+                autostart=bool(cfg.get("autostart", False)),
                 autorestart=cfg.get("autorestart", "never"),
                 exitcodes=self._parse_exitcodes(cfg.get("exitcodes")),
-                startretries=cfg.get("startretries", 3),
-                starttime=cfg.get("starttime", 1),
+                startretries=self._parse_number(cfg, "startretries", 3, int, minimum=0),
+                starttime=self._parse_number(cfg, "starttime", 1, float, minimum=0),
                 stopsignal=self._parse_signal(cfg.get("stopsignal", "TERM")),
-                stoptime=cfg.get("stoptime", 10),
+                stoptime=self._parse_number(cfg, "stoptime", 10, float, minimum=0),
                 stdout=cfg.get("stdout"),
                 stderr=cfg.get("stderr"),
-                env=cfg.get("env"),
+                env={str(k): str(v) for k, v in (cfg.get("env") or {}).items()},
                 workingdir=cfg.get("workingdir"),
                 umask=self._parse_umask(cfg.get("umask")),
-                attachable=cfg.get("attachable", False)
+                attachable=bool(cfg.get("attachable", False)),
+                priority=self._parse_number(cfg, "priority", 999, int),
+                depends_on=self._parse_depends(cfg.get("depends_on")),
+                backoff_base=self._parse_number(cfg, "backoff_base", 1, float, minimum=0),
+                backoff_max=self._parse_number(cfg, "backoff_max", 60, float, minimum=0),
+                backoff_jitter=self._parse_number(cfg, "backoff_jitter", 0.2, float, minimum=0),
+                crash_window=self._parse_number(cfg, "crash_window", 60, float, minimum=0),
+                crash_threshold=self._parse_number(cfg, "crash_threshold", 10, int, minimum=0),
+                output_buffer=self._parse_size(cfg, "output_buffer", 65536),
+                stdout_maxbytes=self._parse_size(cfg, "stdout_maxbytes", 0),
+                stdout_backups=self._parse_number(cfg, "stdout_backups", 10, int, minimum=0),
+                stderr_maxbytes=self._parse_size(cfg, "stderr_maxbytes", 0),
+                stderr_backups=self._parse_number(cfg, "stderr_backups", 10, int, minimum=0),
+                log_compress=cfg.get("log_compress", "gzip"),
+                rlimit_as=self._parse_size(cfg, "rlimit_as", 0),
+                rlimit_nofile=self._parse_number(cfg, "rlimit_nofile", 0, int, minimum=0),
+                rlimit_cpu=self._parse_number(cfg, "rlimit_cpu", 0, int, minimum=0),
+                rlimit_nproc=self._parse_number(cfg, "rlimit_nproc", 0, int, minimum=0),
+                rss_limit=self._parse_size(cfg, "rss_limit", 0),
+                source=path,
             )
-            programs.append(Program(program_cfg))
+        except (TypeError, ValueError, AttributeError) as e:
+            raise ConfigError(f"{where}: {e}")
 
-        return programs
+    def _parse_number(self, cfg, key, default, kind, minimum=None):
+        value = cfg.get(key, default)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"'{key}' must be a number")
+        if kind is int and value != int(value):
+            raise ValueError(f"'{key}' must be an integer")
+        if minimum is not None and value < minimum:
+            raise ValueError(f"'{key}' must be >= {minimum}")
+        return int(value) if kind is int else value
+
+    def _parse_size(self, cfg, key, default):
+        # YAML: 1048576, "512KB", "50MB", "1GB"
+        value = cfg.get(key, default)
+        if isinstance(value, str):
+            text = value.strip().upper()
+            for unit, factor in SIZE_UNITS.items():
+                if text.endswith(unit) and text[:-len(unit)].strip().isdigit():
+                    return int(text[:-len(unit)]) * factor
+            if not text.isdigit():
+                raise ValueError(f"'{key}' must be a size (ex: 1048576, 50MB)")
+            return int(text)
+        return self._parse_number(cfg, key, default, int, minimum=0)
 
     def _parse_signal(self, sig):
-        import signal
         if isinstance(sig, int):
             return sig
-        return getattr(signal, f"SIG{sig}", signal.SIGTERM)
+        name = str(sig).upper()
+        if not name.startswith("SIG"):
+            name = f"SIG{name}"
+        if not isinstance(getattr(signal, name, None), signal.Signals):
+            raise ValueError(f"unknown stopsignal '{sig}'")
+        return int(getattr(signal, name))
 
     def _parse_umask(self, umask):
         if umask is None:
@@ -63,7 +304,18 @@ class ConfigLoader:
 
         # YAML: exitcodes: [0, 2]
         if isinstance(exitcodes, list):
-            return exitcodes
+            return [int(code) for code in exitcodes]
 
         # fallback défensif
         return [int(exitcodes)]
+
+    def _parse_depends(self, depends_on):
+        if depends_on is None:
+            return []
+
+        # YAML: depends_on: db
+        if isinstance(depends_on, str):
+            return [depends_on]
+
+        # YAML: depends_on: [db, cache]
+        return [str(name) for name in depends_on]
@@ -1,6 +1,39 @@
 from typing import Optional, Dict, List
 
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
 class ProgramConfig:
+    """Config compilée d'un programme : validée par le loader, puis figée.
+
+    Slotted (pas de __dict__) et immuable après __init__ : une même instance
+    peut être partagée entre le cache du loader et les Program sans copie.
+    """
+
+    FIELDS = (
+        "name", "cmd", "user", "numprocs", "autostart", "autorestart", "exitcodes",
+        "startretries", "starttime", "stopsignal", "stoptime", "stdout", "stderr",
+        "env", "workingdir", "umask", "attachable", "priority", "depends_on",
+        "backoff_base", "backoff_max", "backoff_jitter", "crash_window", "crash_threshold",
+        "output_buffer", "stdout_maxbytes", "stdout_backups", "stderr_maxbytes",
+        "stderr_backups", "log_compress", "rlimit_as", "rlimit_nofile", "rlimit_cpu",
+        "rlimit_nproc", "rss_limit",
+    )
+    __slots__ = FIELDS + ("source", "_fingerprint")
+
+    # Champs appliqués à chaud au reload ; tout autre champ (sauf numprocs,
+    # géré par scaling) change le process lancé et impose un restart.
+    LIVE_FIELDS = frozenset({
+        "autostart", "autorestart", "exitcodes", "startretries", "starttime",
+        "stopsignal", "stoptime", "priority", "depends_on",
+        "backoff_base", "backoff_max", "backoff_jitter", "crash_window", "crash_threshold",
+        "output_buffer", "rss_limit",
+    })
+
     def __init__(
         self,
         name: str,
@@ -20,21 +53,63 @@ class ProgramConfig:
         workingdir: Optional[str] = None,
         umask: Optional[int] = None,
         attachable: Optional[bool] = False,
+        priority: int = 999,
+        depends_on: Optional[List[str]] = None,
+        backoff_base: float = 1,
+        backoff_max: float = 60,
+        backoff_jitter: float = 0.2,
+        crash_window: float = 60,
+        crash_threshold: int = 10,
+        output_buffer: int = 65536,
+        stdout_maxbytes: int = 0,
+        stdout_backups: int = 10,
+        stderr_maxbytes: int = 0,
+        stderr_backups: int = 10,
+        log_compress: str = "gzip",
+        rlimit_as: int = 0,
+        rlimit_nofile: int = 0,
+        rlimit_cpu: int = 0,
+        rlimit_nproc: int = 0,
+        rss_limit: int = 0,
+        source: Optional[str] = None,
     ):
-        self.name = name
-        self.cmd = cmd
-        self.user = user
-        self.numprocs = numprocs
-        self.autostart = autostart
-        self.autorestart = autorestart
-        self.exitcodes = exitcodes or [0]
-        self.startretries = startretries
-        self.starttime = starttime
-        self.stopsignal = stopsignal
-        self.stoptime = stoptime
-        self.stdout = stdout
-        self.stderr = stderr
-        self.env = env or {}
-        self.workingdir = workingdir
-        self.umask = umask
-        self.attachable = attachable
\ No newline at end of file
+        values = locals()
+        values["exitcodes"] = tuple(exitcodes or (0,))
+        values["env"] = dict(env or {})
+        values["depends_on"] = tuple(depends_on or ())
+        for field in self.FIELDS:
+            object.__setattr__(self, field, values[field])
+        # fichier d'origine : hors FIELDS, déplacer un programme de fichier
+        # ne change pas sa config
+        object.__setattr__(self, "source", source)
+        object.__setattr__(self, "_fingerprint", hash(_freeze(self.as_dict())))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"ProgramConfig is frozen (cannot set '{name}')")
+
+    # pickle : le fingerprint n'est pas stocké, hash() des str
+    # change d'un process à l'autre
+    def __getstate__(self):
+        return tuple(getattr(self, field) for field in self.FIELDS + ("source",))
+
+    def __setstate__(self, state):
+        for field, value in zip(self.FIELDS + ("source",), state):
+            object.__setattr__(self, field, value)
+        object.__setattr__(self, "_fingerprint", hash(_freeze(self.as_dict())))
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def fingerprint(self):
+        """Hash de tous les champs : égal <=> config identique."""
+        return self._fingerprint
+
+    def diff(self, other):
+        """Champs modifiés, triés en (restart requis, applicables à chaud)."""
+        restart, live = [], []
+        for field in self.FIELDS:
+            if field == "numprocs":
+                continue
+            if _freeze(getattr(self, field)) != _freeze(getattr(other, field)):
+                (live if field in self.LIVE_FIELDS else restart).append(field)
+        return restart, live
@@ -0,0 +1,136 @@
+import os
+import glob
+import struct
+import ctypes
+import ctypes.util
+from fnmatch import fnmatch
+
+# inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+def _load_inotify():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1, libc.inotify_add_watch, libc.inotify_rm_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class ConfigWatcher:
+    """Surveille le fichier principal et les fichiers `include:` d'une config.
+
+    Avec inotify, ce sont les dossiers qui sont surveillés (un fichier déposé
+    ou remplacé par rename est vu) et fileno() s'intègre à une boucle
+    d'événements ; read_changes() retourne les fichiers concernés.
+    Sans inotify, fileno() vaut None et poll() compare des stat() toutes les
+    poll_interval secondes.
+    read_changes() / poll() retournent None quand tout doit être rechargé.
+    """
+
+    def __init__(self, path, poll_interval=2.0):
+        self.path = os.path.abspath(path)
+        self.poll_interval = poll_interval
+        self.files = {self.path}
+        self.includes = []
+        self._watches = {}   # wd -> dossier
+        self._snapshot = {}  # mode polling : path -> clé stat
+
+        self._libc = _load_inotify()
+        self._fd = None
+        if self._libc is not None:
+            fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0:
+                self._fd = fd
+
+    def fileno(self):
+        return self._fd
+
+    def update(self, files, includes):
+        """Nouvelle liste de fichiers / globs après un (re)chargement."""
+        self.files = set(files) | {self.path}
+        self.includes = list(includes)
+        if self._fd is None:
+            self._snapshot = self._scan()
+            return
+
+        dirs = {os.path.dirname(f) for f in self.files}
+        for pattern in self.includes:
+            directory = os.path.dirname(pattern)
+            if not any(c in directory for c in "*?["):
+                dirs.add(directory)
+
+        current = {d: wd for wd, d in self._watches.items()}
+        for directory in dirs - current.keys():
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+            if wd >= 0:
+                self._watches[wd] = directory
+        for directory in current.keys() - dirs:
+            self._libc.inotify_rm_watch(self._fd, current[directory])
+            del self._watches[current[directory]]
+
+    def _relevant(self, path):
+        return path in self.files or any(fnmatch(path, p) for p in self.includes)
+
+    def read_changes(self):
+        """Consomme les événements inotify en attente."""
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                directory = self._watches.get(wd)
+                if directory is None or not name:
+                    continue
+                path = os.path.join(directory, os.fsdecode(name))
+                if self._relevant(path):
+                    changed.add(path)
+        return changed
+
+    def _scan(self):
+        snapshot = {}
+        paths = set(self.files)
+        for pattern in self.includes:
+            paths.update(os.path.abspath(p) for p in glob.glob(pattern))
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (st.st_ino, st.st_size, st.st_mtime_ns)
+        return snapshot
+
+    def poll(self):
+        """Mode sans inotify : fichiers modifiés, créés ou supprimés depuis le dernier scan."""
+        snapshot = self._scan()
+        changed = {
+            path for path in snapshot.keys() | self._snapshot.keys()
+            if snapshot.get(path) != self._snapshot.get(path)
+        }
+        self._snapshot = snapshot
+        return changed
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -1,7 +1,8 @@
 import os
 import sys
-from config.loader import ConfigLoader
+from config.loader import ConfigLoader, ConfigError
 from process.manager import ProcessManager
+from process.boot import BootPlanner
 from shell.control import ControlShell
 
 PID_FILE = "/tmp/taskmaster.pid"
@@ -23,14 +24,21 @@ def main():
 
     # Charge la config initiale
     loader = ConfigLoader(config_path)
-    programs = loader.load()
+    try:
+        programs = loader.load()
+    except ConfigError as e:
+        print(f"[TaskMaster] Invalid configuration: {e}")
+        sys.exit(1)
     for program in programs:
         manager.add_program(program)
-        if program.config.autostart:
-            manager.start_program(program.config.name)
+
+    # Autostart : vagues parallèles dans l'ordre des dépendances, avancées
+    # par la boucle du shell comme le daemon le fait sur sa boucle asyncio
+    boot = BootPlanner(manager)
+    manager.sampler.start()
 
     # Lance le shell
-    shell = ControlShell(manager)
+    shell = ControlShell(manager, boot)
     try:
         shell.run()
     except KeyboardInterrupt:
@@ -0,0 +1,137 @@
+import time
+from utils.enums import ProcessState
+
+
+class BootPlanner:
+    """Démarrage des programmes autostart par vagues de dépendances.
+
+    Tous les programmes dont les dépendances sont prêtes sont lancés ensemble
+    (par priorité croissante) et leurs start checks courent en parallèle ; un
+    programme dépendant n'est lancé qu'une fois ses dépendances passées.
+    step() ne bloque jamais : la boucle appelante attend timeout() ou un exit.
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.pending = {}    # name -> set(dépendances)
+        self.starting = {}   # name -> Program en cours de start check
+        self.ready = set()
+        self.failed = set()
+        self.started_at = time.time()
+
+        autostart = {
+            name: prog for name, prog in manager.programs.items() if prog.config.autostart
+        }
+        for name, prog in autostart.items():
+            deps = set()
+            for dep in prog.config.depends_on:
+                if dep not in manager.programs:
+                    manager.log(f"[Boot] '{name}' depends on unknown program '{dep}'", level="ERROR")
+                    self.failed.add(name)
+                elif dep not in autostart:
+                    manager.log(
+                        f"[Boot] '{name}' depends on '{dep}' which is not autostarted, ignoring",
+                        level="WARNING"
+                    )
+                else:
+                    deps.add(dep)
+            if name not in self.failed:
+                self.pending[name] = deps
+
+        for name in self._find_cycles():
+            manager.log(f"[Boot] '{name}' is part of a dependency cycle", level="ERROR")
+            del self.pending[name]
+            self.failed.add(name)
+
+    def _find_cycles(self):
+        # Kahn : ce qui ne peut jamais être ordonné appartient à un cycle
+        remaining = {name: set(deps) for name, deps in self.pending.items()}
+        progress = True
+        while progress:
+            progress = False
+            for name, deps in list(remaining.items()):
+                if not (deps & remaining.keys()):
+                    del remaining[name]
+                    progress = True
+        return list(remaining)
+
+    def step(self, now=None):
+        """Avance le boot ; retourne True quand il est terminé."""
+        now = time.time() if now is None else now
+
+        for name, prog in list(self.starting.items()):
+            result = self._start_check(prog, now)
+            if result is None:
+                continue
+            del self.starting[name]
+            if result:
+                self.ready.add(name)
+            else:
+                self.failed.add(name)
+                self.manager.log(f"[Boot] '{name}' failed its start check", level="WARNING")
+
+        changed = True
+        while changed:
+            changed = False
+            wave = []
+            for name, deps in list(self.pending.items()):
+                if deps & self.failed:
+                    del self.pending[name]
+                    self.failed.add(name)
+                    self.manager.log(
+                        f"[Boot] Not starting '{name}': dependency failed", level="WARNING"
+                    )
+                    changed = True
+                elif deps <= self.ready:
+                    wave.append(name)
+
+            wave.sort(key=lambda n: (self.manager.programs[n].config.priority, n))
+            for name in wave:
+                del self.pending[name]
+                prog = self.manager.programs.get(name)
+                if prog is None:
+                    self.failed.add(name)
+                    continue
+                self.manager.start_program(name)
+                self.starting[name] = prog
+
+        if self.done():
+            instances = sum(
+                len(self.manager.programs[name].processes)
+                for name in self.ready if name in self.manager.programs
+            )
+            self.manager.log(
+                f"[Boot] {len(self.ready)} programs ({instances} instances) "
+                f"started in {time.time() - self.started_at:.2f}s, {len(self.failed)} failed"
+            )
+            return True
+        return False
+
+    def done(self):
+        return not self.pending and not self.starting
+
+    def timeout(self, now=None):
+        """Délai avant la prochaine échéance de start check."""
+        now = time.time() if now is None else now
+        deadlines = [
+            inst.start_time + prog.config.starttime
+            for prog in self.starting.values()
+            for inst in prog.processes
+            if inst.state == ProcessState.STARTING and inst.start_time
+        ]
+        if not deadlines:
+            return 0.1
+        return max(min(deadlines) - now, 0.01)
+
+    def _start_check(self, prog, now):
+        """True si le programme est bien démarré, False s'il a échoué, None sinon."""
+        for inst in prog.processes:
+            if inst.state == ProcessState.RUNNING:
+                continue
+            if inst.state == ProcessState.STARTING or inst.timer:
+                # pas encore promu, ou retry différé en attente
+                return None
+            elif inst.exit_code not in prog.config.exitcodes or inst.stop_reason:
+                # abandon après retries, spawn échoué ou stop pendant le boot
+                return False
+        return True
@@ -3,23 +3,54 @@ import time
 
 class ProcessInstance:
     def __init__(self):
+        self.program = None         # Program propriétaire (compteurs d'états), voir Program.add_instances
+        self.index = 0              # rang dans program.processes, gardé une fois détachée
         self.pid = None
         self.state = ProcessState.STOPPED
         self.exited_flag = False
         self.exit_code = None
         self.start_time = None      # timestamp du fork
         self.retry_count = 0        # nombre de tentatives de start
+        self.crash_count = 0        # sorties non prévues après RUNNING, voir STABLE_WINDOW
+        self.running_since = None   # monotonic du passage en RUNNING
         self.stop_reason = None
         self.pty_master_fd = None
         self.is_attachable = False
         self.is_attached = False
+        self.timer = None           # timer en attente (promotion RUNNING / deadline de stop)
+        self.restart_pending = False
+        self.output = None          # OutputRing quand la sortie est capturée (daemon)
+
+    @property
+    def state(self):
+        return self._state
+
+    @state.setter
+    def state(self, state):
+        # chaque transition met à jour les compteurs du programme : status
+        # n'a plus à parcourir les instances
+        if self.program is not None and state is not self._state:
+            self.program.transition(self._state, state)
+        self._state = state
 
     def mark_started(self, pid):
         self.pid = pid
-        self.state = ProcessState.RUNNING
+        self.state = ProcessState.STARTING
         self.exited_flag = False
         self.start_time = time.time()
         self.exit_code = None
+        self.stop_reason = None
+
+    def mark_running(self):
+        self.state = ProcessState.RUNNING
+        self.retry_count = 0
+        self.running_since = time.monotonic()
+
+    def can_start(self):
+        return self.state in (ProcessState.STOPPED, ProcessState.BACKOFF, ProcessState.FATAL)
+
+    def is_alive(self):
+        return self.state in (ProcessState.STARTING, ProcessState.RUNNING, ProcessState.STOPPING)
 
     def mark_exited(self, exit_code=None, manual=False):
         self.state = ProcessState.STOPPED
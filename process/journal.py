@@ -0,0 +1,260 @@
+import os
+import mmap
+import time
+import fcntl
+import signal
+import struct
+from collections import Counter, deque
+from utils.private_dir import PRIVATE_DIR, private_dir, open_private
+
+# fichier mappé : dans le dossier privé (0700) de l'utilisateur, jamais dans
+# /tmp où un autre utilisateur pourrait le créer, le tronquer (SIGBUS) ou
+# le remplacer par un lien
+JOURNAL_FILE = os.path.join(PRIVATE_DIR, "journal")
+MAGIC = b"TMJ1"
+HEADER = struct.Struct("<4sIQ")  # magic, taille d'un record, nombre de records
+HEADER_SIZE = 64
+# ts, id programme, pid, instance, événement, état, exit code, signal, raison, retries
+RECORD = struct.Struct("<dIiHBBhBBH6x")
+TS = struct.Struct("<d")
+GROW_RECORDS = 32768         # le fichier grandit par 1 Mio
+MAX_RECORDS = 1 << 21        # 64 Mio, puis bascule vers <journal>.1
+
+EVENTS = ("start", "running", "exit", "stop", "backoff", "fatal", "spawn_error")
+EVENT_IDS = {name: i for i, name in enumerate(EVENTS)}
+REASONS = (None, "user", "spawn_error", "fatal", "crash_loop", "rss_limit")
+REASON_IDS = {name: i for i, name in enumerate(REASONS)}
+
+USAGE = "usage: history <program[:index]> [--since 1h|30m|<epoch>|<YYYY-mm-ddTHH:MM>] [-n N]"
+DEFAULT_LINES = 50
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+class JournalBusy(Exception):
+    """Journal déjà ouvert par un autre superviseur."""
+
+
+class Journal:
+    """Journal append-only des transitions d'instances, mappé en mémoire.
+
+    Records de taille fixe (RECORD) après un en-tête de HEADER_SIZE octets ;
+    le compteur de l'en-tête n'est avancé qu'après l'écriture du record. Les
+    timestamps ne décroissent jamais : le fichier est son propre index
+    temporel, query(since=...) y fait une recherche dichotomique.
+    Les noms de programmes sont dans <journal>.names (un par ligne, id = rang).
+    """
+
+    def __init__(self, path=JOURNAL_FILE):
+        if private_dir(os.path.dirname(path)) is None:
+            raise PermissionError(f"{os.path.dirname(path)} is not a private (0700) directory")
+        self.path = path
+        self.fd = open_private(path, os.O_RDWR | os.O_CREAT)
+        try:
+            fcntl.flock(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(self.fd)
+            raise JournalBusy(path)
+        self._open_names()
+        self._map()
+
+    def _map(self):
+        size = os.fstat(self.fd).st_size
+        if size >= HEADER_SIZE:
+            self.mm = mmap.mmap(self.fd, size)
+            magic, record_size, count = HEADER.unpack_from(self.mm)
+            if magic == MAGIC and record_size == RECORD.size and \
+                    HEADER_SIZE + count * RECORD.size <= size:
+                self.count = count
+                self.capacity = (size - HEADER_SIZE) // RECORD.size
+                self.last_ts = self._ts(count - 1) if count else 0.0
+                return
+            self.mm.close()
+        # fichier neuf ou illisible : on repart de zéro
+        os.ftruncate(self.fd, 0)
+        os.ftruncate(self.fd, HEADER_SIZE + GROW_RECORDS * RECORD.size)
+        self.mm = mmap.mmap(self.fd, HEADER_SIZE + GROW_RECORDS * RECORD.size)
+        self.count = 0
+        self.capacity = GROW_RECORDS
+        self.last_ts = 0.0
+        HEADER.pack_into(self.mm, 0, MAGIC, RECORD.size, 0)
+
+    def _open_names(self):
+        self.names_path = self.path + ".names"
+        self.names_fd = open_private(self.names_path, os.O_RDWR | os.O_CREAT | os.O_APPEND)
+        chunks = []
+        while True:
+            data = os.read(self.names_fd, 1 << 16)
+            if not data:
+                break
+            chunks.append(data)
+        self.names = b"".join(chunks).decode(errors="replace").splitlines()
+        self.name_ids = {name: i for i, name in enumerate(self.names)}
+
+    def _name_id(self, name):
+        name_id = self.name_ids.get(name)
+        if name_id is None:
+            name_id = self.name_ids[name] = len(self.names)
+            self.names.append(name)
+            os.write(self.names_fd, (name + "\n").encode())
+        return name_id
+
+    def _grow(self):
+        if self.capacity >= MAX_RECORDS:
+            # journal plein : l'ancien part en .1, les noms restent partagés
+            self.mm.close()
+            os.replace(self.path, self.path + ".1")
+            fd = open_private(self.path, os.O_RDWR | os.O_CREAT)
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            os.close(self.fd)
+            self.fd = fd
+            self._map()
+            return
+        self.capacity = min(self.capacity + GROW_RECORDS, MAX_RECORDS)
+        self.mm.resize(HEADER_SIZE + self.capacity * RECORD.size)
+
+    def _ts(self, i):
+        return TS.unpack_from(self.mm, HEADER_SIZE + i * RECORD.size)[0]
+
+    def append(self, name, instance, pid, event, state=0, exit_code=None, sig=0,
+               reason=None, retries=0, ts=None):
+        if self.count >= self.capacity:
+            self._grow()
+        ts = max(time.time() if ts is None else ts, self.last_ts)
+        RECORD.pack_into(
+            self.mm, HEADER_SIZE + self.count * RECORD.size,
+            ts, self._name_id(name), pid or 0, instance, EVENT_IDS[event], state,
+            -1 if exit_code is None else exit_code, sig or 0,
+            REASON_IDS.get(reason, 0), min(retries, 0xFFFF),
+        )
+        self.last_ts = ts
+        self.count += 1
+        HEADER.pack_into(self.mm, 0, MAGIC, RECORD.size, self.count)
+
+    def record(self, event, program, inst, info):
+        """Hook du manager (ProcessManager.event_hooks)."""
+        self.append(
+            program.config.name, inst.index, info.get("pid", inst.pid), event,
+            inst.state.value, info.get("exit_code"), info.get("signal"),
+            inst.stop_reason, info.get("attempt", inst.retry_count),
+        )
+
+    def bisect(self, since):
+        """Rang du premier record avec ts >= since."""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._ts(mid) < since:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def query(self, name=None, instance=None, since=None, limit=None):
+        """Records (dicts) depuis since, filtrés par programme / instance ; les limit derniers."""
+        name_id = None
+        if name is not None:
+            name_id = self.name_ids.get(name)
+            if name_id is None:
+                return []
+        start = self.bisect(since) if since is not None else 0
+        out = deque(maxlen=limit) if limit else []
+        mm, size = self.mm, RECORD.size
+        for offset in range(HEADER_SIZE + start * size, HEADER_SIZE + self.count * size, size):
+            ts, pid_name, pid, index, event, state, code, sig, reason, retries = \
+                RECORD.unpack_from(mm, offset)
+            if name_id is not None and pid_name != name_id:
+                continue
+            if instance is not None and index != instance:
+                continue
+            if pid_name >= len(self.names) or event >= len(EVENTS):
+                continue  # record corrompu : id hors des tables
+            out.append({
+                "ts": ts, "program": self.names[pid_name], "instance": index, "pid": pid,
+                "event": EVENTS[event], "state": state,
+                "exit_code": None if code < 0 else code, "signal": sig,
+                "reason": REASONS[reason] if reason < len(REASONS) else None,
+                "retries": retries,
+            })
+        return list(out)
+
+    def close(self):
+        self.mm.close()
+        os.close(self.fd)
+        os.close(self.names_fd)
+
+
+def parse_since(text, now=None):
+    """'1h', '30m', '90s', '2d', epoch ou 'YYYY-mm-ddTHH:MM[:SS]' -> timestamp."""
+    now = time.time() if now is None else now
+    unit = UNITS.get(text[-1:])
+    if unit and text[:-1].replace(".", "", 1).isdigit():
+        return now - float(text[:-1]) * unit
+    if text.replace(".", "", 1).isdigit():
+        return float(text)
+    for fmt in ("%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M", "%Y-%m-%d"):
+        try:
+            return time.mktime(time.strptime(text, fmt))
+        except ValueError:
+            pass
+    raise ValueError(f"Invalid --since value: {text}")
+
+
+def parse_args(args):
+    """['web', '--since', '1h'] -> ('web', ts, 50) ; ValueError si invalide."""
+    target, since, n = None, None, DEFAULT_LINES
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if arg == "--since" and args:
+            since = parse_since(args.pop(0))
+        elif arg.startswith("--since="):
+            since = parse_since(arg[len("--since="):])
+        elif arg == "-n" and args and args[0].isdigit():
+            n = int(args.pop(0))
+        elif target is None and not arg.startswith("-"):
+            target = arg
+        else:
+            raise ValueError(USAGE)
+    if target is None:
+        raise ValueError(USAGE)
+    return target, since, n
+
+
+def _signal_name(sig):
+    try:
+        return signal.Signals(sig).name
+    except ValueError:
+        return str(sig)
+
+
+def format_record(rec):
+    stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(rec["ts"]))
+    line = f"{stamp} {rec['program']}:{rec['instance']} {rec['event']:<11} pid={rec['pid']}"
+    if rec["exit_code"] is not None:
+        line += f" code={rec['exit_code']}"
+    if rec["signal"]:
+        line += f" signal={_signal_name(rec['signal'])}"
+    if rec["reason"]:
+        line += f" reason={rec['reason']}"
+    if rec["retries"]:
+        line += f" retries={rec['retries']}"
+    return line
+
+
+def history(journal, programs, args):
+    """Commande history (shell et socket) -> lignes ; ValueError si invalide."""
+    target, since, n = parse_args(args)
+    name, _, index = target.partition(":")
+    if name not in programs and name not in journal.name_ids:
+        raise ValueError(f"Unknown program: {name}")
+    if index and not index.isdigit():
+        raise ValueError(f"Invalid instance index: {target}")
+    instance = int(index) if index else None
+
+    records = journal.query(name, instance, since)
+    lines = [format_record(rec) for rec in records[-n:]] if n else []
+    counts = Counter(rec["event"] for rec in records)
+    summary = ", ".join(f"{counts[e]} {e}" for e in EVENTS if counts[e]) or "no events"
+    window = f" since {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(since))}" if since else ""
+    lines.append(f"{target}: {summary}{window}")
+    return lines
@@ -1,14 +1,26 @@
 # process/manager.py
 import os
+import select
 import signal
 import time
+from collections import deque
 from process.program import Program
-from process.instance import ProcessInstance
+from process.spawn import SpawnPlan, SpawnError
+from process.output import OutputMultiplexer
+from process.journal import Journal, JournalBusy
+from process.metrics import Sampler
 from utils.enums import ProcessState
-from config.loader import ConfigLoader
-from datetime import datetime
+from utils.timer_wheel import TimerWheel
+from utils.rotation import RotatingFile
+from utils.log_pipeline import pipeline, level_value, format_time, STDOUT
+from config.loader import ConfigLoader, ConfigError
+from signals.handlers import install_wakeup_fd, notify_fd, drain_fd
 
 LOG_FILE = "/tmp/taskmaster.log"
+LOG_MAXBYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 5
+# secondes en RUNNING avant d'oublier les crashs précédents (crash_count)
+STABLE_WINDOW = 30.0
 
 class ProcessManager:
     LOG_COLORS = {
@@ -24,26 +36,60 @@ class ProcessManager:
         self.programs = {}
         self.config_path = config_path
         self.reloading = False
-        self._exited_pids = []
+        self._exited_pids = deque()  # FIFO des (pid, exit_code, signal) en attente
+        self._pid_index = {}  # pid -> (program, instance), O(1) au reaping
+        self._snapshot = (-1, [])  # (Program.generation, lignes de status)
         self.manual_stop_pids = set()  # 🔹 PIDs stoppés manuellement
         self.reload_requested = False
+        # fichiers / globs de la config chargée (watcher du daemon)
+        self.config_files = []
+        self.config_includes = []
+        # remplace le spawn par défaut (ex: ManagerWrapper, pipes / pty du daemon)
+        self.instance_starter = None
         self.log_level = log_level
-        self.log_file = open(LOG_FILE, "a")
-
-        # signaux
+        self._min_level = level_value(log_level)
+        self.log_file = RotatingFile(LOG_FILE, LOG_MAXBYTES, LOG_BACKUPS)
+        # promotions RUNNING, deadlines de stop, restarts différés
+        self.timers = TimerWheel()
+        # relevé /proc CPU / RSS / fds des instances (démarré par le daemon / main)
+        self.sampler = Sampler(self)
+        # pipes de sortie des enfants capturés (un seul epoll pour toute la flotte)
+        self.output = OutputMultiplexer()
+        # hook(event, program, inst, info) appelé à chaque transition d'instance
+        self.event_hooks = []
+        self.journal = None
+        try:
+            self.journal = Journal()
+            self.event_hooks.append(self.journal.record)
+        except JournalBusy as e:
+            self.log(f"Journal {e} used by another supervisor, history disabled", level="WARNING")
+        except OSError as e:
+            self.log(f"Cannot open journal: {e}, history disabled", level="WARNING")
+
+        # signaux : les handlers ne font que noter l'événement, le self-pipe
+        # réveille la boucle de supervision (wait/dispatch)
+        self._wakeup_r, self._wakeup_w = install_wakeup_fd()
         signal.signal(signal.SIGCHLD, self.handle_sigchld)
         signal.signal(signal.SIGHUP, self.handle_sighup)
 
     def log(self, message, level="INFO"):
-        levels_order = ["DEBUG", "INFO", "WARNING", "ERROR"]
-        if levels_order.index(level) < levels_order.index(self.log_level):
+        if level_value(level) < self._min_level:
             return  # skip lower level messages
-        timestamp = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
+        # formatage et écritures dans le thread writer
+        pipeline.submit(self._format_log, time.time(), level, message)
+
+    def _format_log(self, ts, level, message):
+        timestamp = format_time(ts, "[%Y-%m-%d %H:%M:%S]")
         color = self.LOG_COLORS.get(level, "")
-        reset = self.LOG_RESET
-        print(f"{color}{timestamp} [{level}] {message}{reset}", flush=True)
-        self.log_file.write(message + "\n")
-        self.log_file.flush()
+        return (
+            (STDOUT, f"{color}{timestamp} [{level}] {message}{self.LOG_RESET}\n"),
+            (self.log_file, message + "\n"),
+        )
+
+    def emit(self, event, program, inst, **info):
+        """Transition d'instance (process.journal.EVENTS) vers les hooks."""
+        for hook in self.event_hooks:
+            hook(event, program, inst, info)
 
     # =========================
     # Program management
@@ -52,47 +98,56 @@ class ProcessManager:
     def add_program(self, program: Program):
         self.programs[program.config.name] = program
 
+    def snapshot(self):
+        """(génération, [(nom, Program.status())]) de toute la flotte.
+
+        Reconstruit seulement si la génération a bougé depuis le dernier
+        appel, et seuls les programmes modifiés recalculent leur status.
+        """
+        if self._snapshot[0] != Program.generation:
+            self._snapshot = (
+                Program.generation,
+                [(name, prog.status()) for name, prog in self.programs.items()],
+            )
+        return self._snapshot
+
     def start_program(self, name: str):
         program = self.programs.get(name)
         if not program:
             self.log(f"Program '{name}' not found")
             return
+        program.reset_breaker()
         for inst in program.processes:
-            if inst.state == ProcessState.STOPPED:
+            if inst.can_start():
+                inst.crash_count = 0
                 self._start_instance(program, inst)
 
     def _start_instance(self, program, inst):
-        pid = os.fork()
-        if pid == 0:
-            # Child
-            try:
-                # stdout/stderr
-                if program.config.stdout:
-                    fd_out = os.open(program.config.stdout, os.O_CREAT | os.O_WRONLY | os.O_APPEND, 0o644)
-                    os.dup2(fd_out, 1)
-                    os.close(fd_out)
-                if program.config.stderr:
-                    fd_err = os.open(program.config.stderr, os.O_CREAT | os.O_WRONLY | os.O_APPEND, 0o644)
-                    os.dup2(fd_err, 2)
-                    os.close(fd_err)
-                # working dir / umask
-                if program.config.workingdir:
-                    os.chdir(program.config.workingdir)
-                if program.config.umask is not None:
-                    os.umask(program.config.umask)
-                # env vars
-                if hasattr(program.config, "env") and program.config.env:
-                    os.environ.update(program.config.env)
-
-                os.execv("/bin/sh", ["sh", "-c", program.config.cmd])
-            except Exception as e:
-                print(f"Failed to exec {program.config.cmd}: {e}", flush=True)
-                os._exit(1)
+        if self.instance_starter:
+            self.instance_starter(program, inst)
+            return
+        try:
+            pid = program.spawn_plan.spawn()
+        except (OSError, SpawnError) as e:
+            self.log(f"Failed to exec {program.config.cmd}: {e}", level="ERROR")
+            inst.stop_reason = "spawn_error"
+            self.emit("spawn_error", program, inst)
+            return
+        self.track_instance(program, inst, pid)
+        # inst.retry_count += 1
+        self.log(f"Started '{program.config.name}' with pid {pid}")
+
+    def track_instance(self, program, inst, pid):
+        """Marque l'instance démarrée et l'indexe par PID pour process_exited."""
+        inst.mark_started(pid)
+        self._pid_index[pid] = (program, inst)
+        self.emit("start", program, inst)
+        if program.config.starttime > 0:
+            self._set_timer(inst, program.config.starttime, self._promote, program, inst, pid)
         else:
-            # Parent
-            inst.mark_started(pid)
-            # inst.retry_count += 1
-            self.log(f"Started '{program.config.name}' with pid {pid}")
+            self._cancel_timer(inst)
+            inst.mark_running()
+            self.emit("running", program, inst)
 
     def stop_program(self, name: str):
         program = self.programs.get(name)
@@ -100,62 +155,177 @@ class ProcessManager:
             self.log(f"Program '{name}' not found")
             return
         for inst in program.processes:
-            if inst.state == ProcessState.RUNNING and inst.pid:
-                pid = inst.pid
-                self.manual_stop_pids.add(pid)  # 🔹 marque le PID stoppé manuellement
-                try:
-                    signal_to_send = getattr(program.config, "stopsignal", signal.SIGTERM)
-                    os.kill(pid, signal_to_send)
-                except ProcessLookupError:
-                    pass
-                inst.state = ProcessState.STOPPED  # 🔹 stop immédiat pour éviter restart
-                inst.stop_reason = "user"
-                self.log(f"Stopped '{name}' pid={pid}")
+            self._stop_instance(program, inst)
+
+    def _stop_instance(self, program, inst, reason="user"):
+        if reason == "user":
+            # un stop demandé annule tout restart en attente (restart, reload,
+            # rss_limit), y compris sur une instance déjà STOPPING
+            inst.restart_pending = False
+        if inst.state in (ProcessState.STARTING, ProcessState.RUNNING) and inst.pid:
+            pid = inst.pid
+            self.manual_stop_pids.add(pid)  # 🔹 marque le PID stoppé manuellement
+            # le PID reste indexé jusqu'au reaping pour que process_exited
+            # retrouve l'instance et consomme manual_stop_pids
+            try:
+                signal_to_send = getattr(program.config, "stopsignal", signal.SIGTERM)
+                os.kill(pid, signal_to_send)
+            except ProcessLookupError:
+                pass
+            inst.state = ProcessState.STOPPING  # 🔹 SIGKILL si toujours là après stoptime
+            inst.stop_reason = reason
+            self.emit("stop", program, inst)
+            self._set_timer(inst, program.config.stoptime, self._stop_timeout, program, inst, pid)
+            self.log(f"Stopped '{program.config.name}' pid={pid}")
+        elif inst.state == ProcessState.BACKOFF:
+            # restart différé en attente : annulé
+            self._cancel_timer(inst)
+            inst.state = ProcessState.STOPPED
+            inst.stop_reason = reason
+            self.emit("stop", program, inst)
+
+    def enforce_rss_limit(self, program, inst, rss):
+        """Plafond rss_limit dépassé (vu par le Sampler) : restart propre de
+        l'instance, stopsignal puis relance une fois reapée."""
+        if inst.state is not ProcessState.RUNNING or inst.restart_pending:
+            return
+        self.log(
+            f"'{program.config.name}' pid={inst.pid} RSS {rss // 1024 ** 2} MiB over "
+            f"rss_limit {program.config.rss_limit // 1024 ** 2} MiB, restarting",
+            level="WARNING",
+        )
+        self._stop_instance(program, inst, reason="rss_limit")
+        inst.restart_pending = True
+
+    def has_children(self):
+        """True tant qu'un enfant lancé n'a pas été reapé."""
+        return bool(self._pid_index)
+
+    def wait_stopped(self):
+        """Après un stop de tout : boucle jusqu'au reaping du dernier enfant,
+        les deadlines de stop envoient SIGKILL après stoptime."""
+        while self.has_children():
+            self.wait()
 
     def restart_program(self, name: str):
+        program = self.programs.get(name)
         self.stop_program(name)
+        if not program:
+            return
+        # relance de chaque instance une fois l'ancien process reapé
+        for inst in program.processes:
+            if inst.state == ProcessState.STOPPING:
+                inst.restart_pending = True
         self.start_program(name)
 
+    # =========================
+    # Timers
+    # =========================
+
+    def _set_timer(self, inst, delay, callback, *args):
+        self._cancel_timer(inst)
+        inst.timer = self.timers.schedule(delay, callback, *args)
+
+    def _cancel_timer(self, inst):
+        self.timers.cancel(inst.timer)
+        inst.timer = None
+
+    def _promote(self, program, inst, pid):
+        inst.timer = None
+        if inst.pid == pid and inst.state == ProcessState.STARTING:
+            inst.mark_running()
+            self.emit("running", program, inst)
+            self.log(
+                f"'{program.config.name}' pid={pid} entered RUNNING state "
+                f"(alive more than {program.config.starttime}s)"
+            )
+
+    def _stop_timeout(self, program, inst, pid):
+        inst.timer = None
+        if inst.pid == pid and inst.state == ProcessState.STOPPING:
+            self.log(
+                f"'{program.config.name}' pid={pid} still alive after {program.config.stoptime}s, "
+                f"sending SIGKILL", level="WARNING"
+            )
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    def _schedule_restart(self, program, inst, delay=0):
+        self._set_timer(inst, delay, self._deferred_start, program, inst)
+
+    def _deferred_start(self, program, inst):
+        inst.timer = None
+        # programme retiré / remplacé au reload, ou instance déjà relancée
+        if self.programs.get(program.config.name) is not program or inst not in program.processes:
+            return
+        if inst.state == ProcessState.BACKOFF:
+            self._start_instance(program, inst)
+
+    def _trip_breaker(self, program):
+        self.log(
+            f"'{program.config.name}' restarted more than "
+            f"{program.config.crash_threshold * program.config.numprocs} times in "
+            f"{program.config.crash_window}s, circuit breaker open (FATAL)",
+            level="ERROR"
+        )
+        for inst in program.processes:
+            if inst.state == ProcessState.BACKOFF:
+                self._cancel_timer(inst)
+                inst.state = ProcessState.FATAL
+                inst.stop_reason = "crash_loop"
+                self.emit("fatal", program, inst)
+
     # =========================
     # SIGCHLD
     # =========================
 
     def handle_sigchld(self, signum, frame):
+        self.reap_children()
+
+    def reap_children(self):
+        """waitpid non bloquant : empile les (pid, exit_code) pour process_exited."""
         while True:
             try:
                 pid, status = os.waitpid(-1, os.WNOHANG)
                 if pid == 0:
                     break
                 exit_code = os.WEXITSTATUS(status) if os.WIFEXITED(status) else None
-                self._exited_pids.append((pid, exit_code))
+                sig = os.WTERMSIG(status) if os.WIFSIGNALED(status) else None
+                self._exited_pids.append((pid, exit_code, sig))
             except ChildProcessError:
                 break
 
     def process_exited(self):
         while self._exited_pids:
-            pid, exit_code = self._exited_pids.pop(0)
-
-            # Chercher l’instance correspondante au PID
-            matched_inst = None
-            for prog in self.programs.values():
-                for inst in prog.processes:
-                    if inst.pid == pid:
-                        matched_inst = inst
-                        matched_prog = prog
-                        break
-                if matched_inst:
-                    break
+            pid, exit_code, sig = self._exited_pids.popleft()
 
-            if not matched_inst:
+            # Lookup O(1) de l'instance correspondante au PID
+            entry = self._pid_index.pop(pid, None)
+            if entry is None:
                 # PID inconnu, probablement déjà stoppé ou éteint
                 self.log(f"[SIGCHLD] Unknown PID {pid} exited with {exit_code}", level="DEBUG")
                 continue
+            matched_prog, matched_inst = entry
 
             # 🔹 ignore les PIDs stoppés manuellement
             if pid in self.manual_stop_pids:
                 self.manual_stop_pids.remove(pid)
-                matched_inst.stop_reason = "user"
+                if matched_inst.pid == pid:
+                    self._cancel_timer(matched_inst)
+                    matched_inst.mark_exited(exit_code, manual=True)
+                    matched_inst.stop_reason = matched_inst.stop_reason or "user"
+                    self.emit("exit", matched_prog, matched_inst, pid=pid, exit_code=exit_code, signal=sig)
                 self.log(f"Process {pid} stopped manually, not restarting")
+                if matched_inst.restart_pending:
+                    matched_inst.restart_pending = False
+                    self._start_instance(matched_prog, matched_inst)
+                continue
+
+            if matched_inst.pid != pid:
+                # instance déjà relancée entre-temps : ancien PID obsolète
+                self.log(f"[SIGCHLD] Stale PID {pid} exited with {exit_code}", level="DEBUG")
                 continue
 
             # maintenant on peut logger et gérer normalement
@@ -164,39 +334,38 @@ class ProcessManager:
                 level="DEBUG"
             )
 
+            was_starting = matched_inst.state == ProcessState.STARTING
+            self._cancel_timer(matched_inst)
             matched_inst.mark_exited(exit_code)
             prog = matched_prog
             inst = matched_inst
+            self.emit("exit", prog, inst, pid=pid, exit_code=exit_code, signal=sig)
 
             self.log(
                 f"[INSTANCE] program={prog.config.name} pid={pid} "
                 f"state={inst.state} stop_reason={inst.stop_reason}", level="DEBUG"
             )
 
-            startsecs = getattr(prog.config, "startsecs", 0)
+            starttime = prog.config.starttime
             retries = getattr(prog.config, "startretries", 0)
             exitcodes = getattr(prog.config, "exitcodes", [0])
             now = time.time()
             alive_time = (now - inst.start_time) if inst.start_time else 0
             self.log(
                 f"[LIFETIME] program={prog.config.name} pid={pid} "
-                f"alive_time={alive_time:.2f}s startsecs={startsecs}", level="DEBUG"
+                f"alive_time={alive_time:.2f}s starttime={starttime}", level="DEBUG"
             )
 
             restart_needed = False
-            if exit_code not in exitcodes and alive_time < startsecs:
-                if inst.retry_count < retries:
-                    inst.retry_count += 1
-                    self.log(f"Retrying '{prog.config.name}' attempt {inst.retry_count}/{retries}")
-                    restart_needed = True
-                else:
-                    self.log(f"Max retries reached for '{prog.config.name}'")
+            if was_starting and exit_code not in exitcodes:
+                # mort avant d'atteindre RUNNING : échec de démarrage
+                restart_needed = True
             elif prog.config.autorestart == "always":
                 if exit_code not in exitcodes:
                     restart_needed = True
 
             elif prog.config.autorestart == "unexpected":
-                if exit_code not in exitcodes or alive_time < startsecs:
+                if exit_code not in exitcodes:
                     restart_needed = True
 
 
@@ -208,24 +377,56 @@ class ProcessManager:
             )
 
             if restart_needed:
-                if inst.retry_count >= prog.config.startretries:
+                if was_starting and inst.retry_count >= retries:
                     self.log(
                         f"Giving up restarting '{prog.config.name}' after {inst.retry_count} retries",
                         level="WARNING"
                     )
-                    inst.state = ProcessState.STOPPED
+                    inst.state = ProcessState.FATAL
                     inst.stop_reason = "fatal"
+                    self.emit("fatal", prog, inst)
+                    continue
+
+                if prog.record_restart(time.monotonic()):
+                    self._trip_breaker(prog)
+                if prog.breaker_open:
+                    inst.state = ProcessState.FATAL
+                    inst.stop_reason = "crash_loop"
+                    self.emit("fatal", prog, inst)
                     continue
 
-                inst.retry_count += 1
-                self._start_instance(prog, inst)
+                # backoff exponentiel sur les échecs consécutifs de démarrage,
+                # et sur les crashs après RUNNING tant que l'instance n'a pas
+                # tenu STABLE_WINDOW (sinon un crash juste après starttime
+                # relancerait en boucle sans délai)
+                if was_starting:
+                    inst.retry_count += 1
+                    attempt = inst.retry_count
+                    what = f"attempt {attempt}/{retries}"
+                else:
+                    ran = time.monotonic() - inst.running_since if inst.running_since else 0
+                    if ran >= STABLE_WINDOW:
+                        inst.crash_count = 0
+                    inst.crash_count += 1
+                    attempt = inst.crash_count
+                    what = f"after crash {attempt} (ran {ran:.1f}s)"
+                delay = prog.backoff_delay(attempt)
+                inst.state = ProcessState.BACKOFF
+                self.emit("backoff", prog, inst, delay=delay, attempt=attempt)
+                self.log(f"Retrying '{prog.config.name}' {what} in {delay:.2f}s")
+                self._schedule_restart(prog, inst, delay)
 
     # =========================
     # Reload config
     # =========================
 
-    def reload_config(self):
-        self.log("[TaskMaster] Reloading configuration...")
+    def reload_config(self, paths=None):
+        """Recharge la config ; avec paths, seuls les programmes définis (avant
+        ou après) dans ces fichiers sont comparés."""
+        if paths is None:
+            self.log("[TaskMaster] Reloading configuration...")
+        else:
+            self.log(f"[TaskMaster] Reloading configuration ({', '.join(sorted(paths))})...")
         self.reloading = True
 
         if not self.config_path:
@@ -233,48 +434,127 @@ class ProcessManager:
             self.reloading = False
             return
 
+        # Une config invalide ne touche à rien : on garde celle en cours
         loader = ConfigLoader(self.config_path)
-        loaded_programs = loader.load()
-        new_programs = {p.config.name: p for p in loaded_programs}
+        try:
+            configs = loader.load_configs()
+        except ConfigError as e:
+            self.log(f"[TaskMaster] Reload aborted: {e}", level="ERROR")
+            self.reloading = False
+            return
+        self.config_files, self.config_includes = loader.files, loader.includes
+        new_configs = {config.name: config for config in configs}
+
+        # le fichier principal peut changer la liste des includes : reload complet
+        if paths is not None and os.path.abspath(self.config_path) not in paths:
+            scope = {name for name, prog in self.programs.items() if prog.config.source in paths}
+            scope.update(name for name, config in new_configs.items() if config.source in paths)
+            new_configs = {name: config for name, config in new_configs.items() if name in scope}
+        else:
+            scope = self.programs.keys() | new_configs.keys()
 
         # Stop removed programs
+        # (les PIDs stoppés restent dans _pid_index jusqu'au reaping, les
+        # autres entrées du programme sont purgées)
         for name in list(self.programs.keys()):
-            if name not in new_programs:
+            if name in scope and name not in new_configs:
                 self.log(f"Stopping removed program '{name}'")
                 self.stop_program(name)
-                del self.programs[name]
-
-        # Update existing / add new
-        for name, new_prog in new_programs.items():
-            if name in self.programs:
-                old_prog = self.programs[name]
-                if not self.same_config(old_prog.config, new_prog.config):
-                    self.log(f"Config changed for '{name}'")
-                    self.stop_program(name)
-                    old_prog.config = new_prog.config
-                    old_prog.processes = [ProcessInstance() for _ in range(new_prog.config.numprocs)]
-                    if old_prog.config.autostart:
-                        self.start_program(name)
-            else:
-                self.programs[name] = new_prog
-                if new_prog.config.autostart:
+                self._forget_program(self.programs.pop(name))
+
+        # Update existing / add new : seul ce qui a changé est touché
+        for name, new_config in new_configs.items():
+            if name not in self.programs:
+                self.programs[name] = Program(new_config)
+                if new_config.autostart:
                     self.start_program(name)
+                continue
+
+            old_prog = self.programs[name]
+            if old_prog.config.fingerprint() == new_config.fingerprint():
+                continue
+
+            restart_fields, live_fields = old_prog.config.diff(new_config)
+            old_numprocs = old_prog.config.numprocs
+            active = any(inst.is_alive() for inst in old_prog.processes)
+            old_prog.config = new_config
+
+            if restart_fields:
+                self.log(f"Config changed for '{name}' ({', '.join(restart_fields)}), restarting")
+                old_prog.spawn_plan = SpawnPlan(new_config)
+                for inst in old_prog.processes:
+                    if inst.state in (ProcessState.STARTING, ProcessState.RUNNING):
+                        self._stop_instance(old_prog, inst)
+                        inst.restart_pending = True
+                if not active and old_prog.config.autostart:
+                    self.start_program(name)
+            elif live_fields:
+                self.log(f"Config changed for '{name}' ({', '.join(live_fields)}), applied live")
+
+            if new_config.numprocs != old_numprocs:
+                self._scale(old_prog, old_numprocs, active)
 
         self.reloading = False
 
-    def same_config(self, a, b):
-        return (
-            a.cmd == b.cmd and
-            a.autorestart == b.autorestart and
-            a.autostart == b.autostart and
-            a.numprocs == b.numprocs and
-            getattr(a, "stdout", None) == getattr(b, "stdout", None) and
-            getattr(a, "stderr", None) == getattr(b, "stderr", None)
-        )
+    def _scale(self, program, old_numprocs, active):
+        """Ajuste le nombre d'instances sans toucher aux instances conservées."""
+        numprocs = program.config.numprocs
+        self.log(f"Scaling '{program.config.name}' {old_numprocs} -> {numprocs}")
+        if numprocs > old_numprocs:
+            added = program.add_instances(numprocs - len(program.processes))
+            if active or program.config.autostart:
+                for inst in added:
+                    self._start_instance(program, inst)
+        else:
+            excess = program.remove_instances(numprocs)
+            for inst in excess:
+                inst.restart_pending = False
+                self._stop_instance(program, inst)
+
+    def _forget_program(self, program):
+        """Retire de l'index les PIDs d'un programme qui ne seront pas reapés comme stop manuel."""
+        for inst in program.processes:
+            if inst.pid in self._pid_index and inst.pid not in self.manual_stop_pids:
+                del self._pid_index[inst.pid]
+        program.touch()  # disparaît du snapshot
 
     # =========================
     # SIGHUP handler
     # =========================
 
     def handle_sighup(self, signum, frame):
-        self.reload_requested = True
\ No newline at end of file
+        self.reload_requested = True
+
+    # =========================
+    # Event loop
+    # =========================
+
+    def fileno(self):
+        """fd lisible dès qu'un signal ou un wakeup() est en attente."""
+        return self._wakeup_r
+
+    def wakeup(self):
+        """Réveille wait() depuis un autre thread (ex: lecture du prompt)."""
+        notify_fd(self._wakeup_w)
+
+    def wait(self, timeout=None):
+        """Bloque jusqu'au prochain événement (ou timer) puis le traite."""
+        timer_timeout = self.timers.timeout()
+        if timer_timeout is not None and (timeout is None or timer_timeout < timeout):
+            timeout = timer_timeout
+        ready, _, _ = select.select([self._wakeup_r, self.output.fileno()], [], [], timeout)
+        if self.output.fileno() in ready:
+            self.output.poll()
+        self.dispatch()
+
+    def dispatch(self):
+        drain_fd(self._wakeup_r)
+        self.process_exited()
+
+        # Traitement du reload demandé par SIGHUP (SAFE, hors handler)
+        if self.reload_requested:
+            self.reload_requested = False
+            self.log("[TaskMaster] SIGHUP received, reloading configuration...", level="INFO")
+            self.reload_config()
+
+        self.timers.advance()
@@ -0,0 +1,182 @@
+import os
+import time
+
+SAMPLE_INTERVAL = 5.0  # secondes entre deux passes ; 0 désactive l'échantillonnage
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+# /proc/<pid>/stat après le ")" du nom : index des champs utilisés
+STAT_UTIME, STAT_STIME, STAT_THREADS, STAT_STARTTIME, STAT_RSS = 11, 12, 17, 19, 21
+
+# nom, type, aide, clé dans les métriques d'un programme
+EXPOSED = (
+    ("processes", "gauge", "Live instances sampled", "processes"),
+    ("cpu_percent", "gauge", "CPU usage over the last interval (100 = one core)", "cpu_percent"),
+    ("cpu_seconds_total", "counter", "User + system CPU time of live instances", "cpu_seconds"),
+    ("rss_bytes", "gauge", "Resident memory", "rss_bytes"),
+    ("open_fds", "gauge", "Open file descriptors", "fds"),
+    ("threads", "gauge", "Threads", "threads"),
+)
+
+
+def _read(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return os.read(fd, 4096)
+    finally:
+        os.close(fd)
+
+
+def count_fds(pid):
+    """Nombre de fds ouverts ; None si /proc/<pid>/fd n'est pas lisible."""
+    path = f"/proc/{pid}/fd"
+    try:
+        # Linux >= 6.2 : st_size du répertoire = nombre de fds, sans le lister
+        size = os.stat(path).st_size
+        return size if size else len(os.listdir(path))
+    except OSError:
+        return None
+
+
+class Sampler:
+    """Relevé CPU / RSS / fds de toutes les instances vivantes, en une passe.
+
+    Une passe par interval, sur la TimerWheel du manager : pour chaque pid,
+    /proc/<pid>/stat (CPU, threads, RSS) et le nombre d'entrées de
+    /proc/<pid>/fd. Le CPU % est la différence de ticks avec la passe
+    précédente (un pid réutilisé est reconnu à son starttime).
+    Résultat agrégé par programme dans self.programs ; le coût des passes
+    est mesuré (busy, last_duration). Une instance au-dessus du rss_limit
+    de son programme est signalée au manager en fin de passe.
+    """
+
+    def __init__(self, manager, interval=SAMPLE_INTERVAL):
+        self.manager = manager
+        self.interval = interval
+        self.programs = {}     # nom -> métriques agrégées
+        self.prev = {}         # pid -> (starttime, ticks, monotonic)
+        self.passes = 0
+        self.sampled = 0       # pids relevés à la dernière passe
+        self.last_duration = 0.0
+        self.busy = 0.0        # temps CPU cumulé du sampler
+        self.started = None
+        self._exposition = None
+
+    def start(self):
+        if self.interval > 0 and self.started is None:
+            self.started = time.monotonic()
+            self.manager.timers.schedule(self.interval, self._run)
+
+    def _run(self):
+        self.sample()
+        self.manager.timers.schedule(self.interval, self._run)
+
+    def sample(self):
+        cpu0 = time.thread_time()  # CPU du seul thread qui échantillonne
+        now = time.monotonic()
+        prev, current, programs, over = self.prev, {}, {}, []
+        for name, program in self.manager.programs.items():
+            rss_limit = program.config.rss_limit
+            agg = {"processes": 0, "cpu_percent": 0.0, "cpu_seconds": 0.0,
+                   "rss_bytes": 0, "fds": 0, "threads": 0}
+            for inst in program.processes:
+                pid = inst.pid
+                if not pid or not inst.is_alive():
+                    continue
+                try:
+                    fields = _read(f"/proc/{pid}/stat").rsplit(b")", 1)[1].split()
+                except (OSError, IndexError):
+                    continue  # sorti entre-temps
+                ticks = int(fields[STAT_UTIME]) + int(fields[STAT_STIME])
+                starttime = fields[STAT_STARTTIME]
+                last = prev.get(pid)
+                if last is not None and last[0] == starttime and now > last[2]:
+                    agg["cpu_percent"] += (ticks - last[1]) / CLK_TCK / (now - last[2]) * 100
+                current[pid] = (starttime, ticks, now)
+                fds = count_fds(pid)
+                agg["processes"] += 1
+                agg["cpu_seconds"] += ticks / CLK_TCK
+                rss = int(fields[STAT_RSS]) * PAGE_SIZE
+                if rss_limit and rss > rss_limit:
+                    over.append((program, inst, rss))
+                agg["rss_bytes"] += rss
+                agg["fds"] += fds or 0
+                agg["threads"] += int(fields[STAT_THREADS])
+            agg["cpu_percent"] = round(agg["cpu_percent"], 2)
+            agg["cpu_seconds"] = round(agg["cpu_seconds"], 2)
+            programs[name] = agg
+        self.prev = current
+        self.programs = programs
+        self.sampled = len(current)
+        self.passes += 1
+        self._exposition = None
+        self.last_duration = time.monotonic() - now
+        self.busy += time.thread_time() - cpu0
+        for program, inst, rss in over:
+            self.manager.enforce_rss_limit(program, inst, rss)
+
+    def overhead(self):
+        """Part d'un cœur consommée par le sampler depuis start()."""
+        if self.started is None:
+            return 0.0
+        return self.busy / max(time.monotonic() - self.started, 1e-9)
+
+    def summary(self):
+        return {
+            "interval": self.interval, "passes": self.passes, "sampled": self.sampled,
+            "last_pass_ms": round(self.last_duration * 1000, 2),
+            "overhead_percent": round(self.overhead() * 100, 3),
+        }
+
+    def exposition(self):
+        """Format texte Prometheus, reconstruit une fois par passe."""
+        if self._exposition is None:
+            lines = []
+            for metric, kind, help_text, key in EXPOSED:
+                lines.append(f"# HELP taskmaster_program_{metric} {help_text}")
+                lines.append(f"# TYPE taskmaster_program_{metric} {kind}")
+                for name, agg in self.programs.items():
+                    lines.append(f'taskmaster_program_{metric}{{program="{_label(name)}"}} {agg[key]}')
+            lines += [
+                "# HELP taskmaster_sampler_duration_seconds Duration of the last sampling pass",
+                "# TYPE taskmaster_sampler_duration_seconds gauge",
+                f"taskmaster_sampler_duration_seconds {self.last_duration:.6f}",
+                "# HELP taskmaster_sampler_cpu_seconds_total CPU time spent sampling",
+                "# TYPE taskmaster_sampler_cpu_seconds_total counter",
+                f"taskmaster_sampler_cpu_seconds_total {self.busy:.6f}",
+            ]
+            self._exposition = ("\n".join(lines) + "\n").encode()
+        return self._exposition
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _size(n):
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if n < 1024 or unit == "GiB":
+            return f"{n:.0f}{unit}" if unit == "B" else f"{n:.1f}{unit}"
+        n /= 1024
+
+
+def stats(sampler, programs, names=()):
+    """Commande stats (shell et socket) -> (lignes, data) ; ValueError si programme inconnu."""
+    for name in names:
+        if name not in programs:
+            raise ValueError(f"Unknown program: {name}")
+    if sampler.passes == 0:
+        return ["OK no sample yet"], {"sampler": sampler.summary(), "programs": {}}
+    selected = {name: sampler.programs[name] for name in (names or sampler.programs)
+                if name in sampler.programs}
+    lines = [
+        f"{name} procs={agg['processes']} cpu={agg['cpu_percent']:.1f}% "
+        f"rss={_size(agg['rss_bytes'])} fds={agg['fds']} threads={agg['threads']}"
+        for name, agg in selected.items()
+    ]
+    summary = sampler.summary()
+    lines.append(
+        f"OK {summary['sampled']} processes sampled in {summary['last_pass_ms']}ms "
+        f"every {sampler.interval:g}s (overhead {summary['overhead_percent']}%)"
+    )
+    return lines, {"sampler": summary, "programs": selected}
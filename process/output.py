@@ -0,0 +1,265 @@
+import os
+import fcntl
+import selectors
+from collections import deque
+from itertools import islice
+from utils.rotation import rotate
+
+READ_SIZE = 65536
+MAX_LINE = 65536  # au-delà, une ligne sans '\n' est découpée
+SPLICE_SIZE = 1 << 20  # pipe agrandi à 1 Mio pour les flux copiés
+SPLICE_BURST = 4  # splices max par flux et par poll, pour rester équitable
+SPLICE_FLAGS = getattr(os, "SPLICE_F_MOVE", 0) | getattr(os, "SPLICE_F_NONBLOCK", 0)
+SINK_FLAGS = os.O_CREAT | os.O_WRONLY  # pas d'O_APPEND : splice() le refuse
+
+
+class OutputRing:
+    """Dernières lignes de sortie d'une instance, bornées à max_bytes.
+
+    seq compte toutes les lignes reçues depuis la création : un lecteur
+    (tail -f) retient le seq vu et since() lui rend la suite.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.lines = deque()
+        self.size = 0
+        self.seq = 0
+
+    def append(self, line):
+        line = line[:self.max_bytes]
+        self.lines.append(line)
+        self.size += len(line) + 1
+        self.seq += 1
+        self._evict()
+
+    def resize(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def _evict(self):
+        while self.size > self.max_bytes and self.lines:
+            self.size -= len(self.lines.popleft()) + 1
+
+    def tail(self, n):
+        lines = list(islice(reversed(self.lines), max(n, 0)))
+        lines.reverse()
+        return lines
+
+    def since(self, seq):
+        """(lignes reçues après seq encore en mémoire, nouveau seq)."""
+        missed = min(self.seq - seq, len(self.lines))
+        return self.tail(missed), self.seq
+
+
+class FileSink:
+    """Fichier de sortie écrit par le daemon.
+
+    Un seul fd par chemin, partagé par toutes les instances qui y écrivent :
+    le daemon est le seul writer, l'offset partagé remplace O_APPEND.
+    Au-delà de maxbytes le fichier est tourné (rename + réouverture, la
+    compression part au worker de utils.rotation) sans toucher aux enfants.
+    """
+    __slots__ = ("path", "fd", "refs", "size", "maxbytes", "backups", "compress")
+
+    def __init__(self, path, maxbytes=0, backups=0, compress="gzip"):
+        self.path = path
+        self.refs = 0
+        self.configure(maxbytes, backups, compress)
+        self._open()
+
+    def configure(self, maxbytes, backups, compress):
+        self.maxbytes = maxbytes
+        self.backups = backups
+        self.compress = compress
+
+    def _open(self):
+        self.fd = os.open(self.path, SINK_FLAGS, 0o644)
+        self.size = os.lseek(self.fd, 0, os.SEEK_END)
+
+    def room(self, limit):
+        """Octets à copier au plus pour tourner pile à maxbytes."""
+        if not self.maxbytes:
+            return limit
+        return max(min(limit, self.maxbytes - self.size), 1)
+
+    def written(self, n):
+        self.size += n
+        if self.maxbytes and self.size >= self.maxbytes:
+            try:
+                rotate(self.path, self.backups, self.compress)
+            except FileNotFoundError:
+                pass  # supprimé à la main : on repart d'un fichier neuf
+            os.close(self.fd)
+            self._open()
+
+
+class OutputStream:
+    __slots__ = ("key", "name", "fd", "partial", "sink", "splice")
+
+    def __init__(self, key, name, fd, sink=None):
+        self.key = key      # identifiant de l'enfant (ex: pid)
+        self.name = name    # "stdout" / "stderr"
+        self.fd = fd
+        self.partial = b""  # fin de ligne incomplète du dernier read
+        self.sink = sink    # FileSink : copie brute, pas de lignes
+        self.splice = hasattr(os, "splice")
+
+
+class OutputMultiplexer:
+    """Sert tous les pipes de sortie des enfants depuis un seul selector (epoll).
+
+    fileno() est lui-même pollable : on l'imbrique dans la boucle appelante
+    (select du manager, add_reader d'asyncio) et poll() traite les pipes
+    prêts. Lectures non bloquantes de READ_SIZE octets, lignes recollées
+    d'un read à l'autre pour chaque flux.
+
+    on_line(stream, line) reçoit chaque ligne complète (bytes, sans '\\n') ;
+    on_eof(key) est appelé quand tous les flux d'un enfant sont fermés.
+
+    Un flux avec un sink (fichier stdout/stderr de la config) n'est pas
+    inspecté : os.splice() déplace les octets du pipe vers le fichier dans le
+    noyau, sans objet Python. Sans splice (ou refusé par le fs), repli sur
+    read + write par blocs.
+    """
+
+    def __init__(self, read_size=READ_SIZE):
+        self.read_size = read_size
+        self.selector = selectors.DefaultSelector()
+        self._open = {}   # key -> nombre de flux encore ouverts
+        self._sinks = {}  # path -> FileSink
+        self.dropped = 0  # octets perdus (écriture du sink en échec)
+
+    def fileno(self):
+        return self.selector.fileno()
+
+    def open_sink(self, path, maxbytes=0, backups=0, compress="gzip"):
+        """FileSink partagé pour path (OSError si le fichier ne s'ouvre pas)."""
+        sink = self._sinks.get(path)
+        if sink is None:
+            sink = self._sinks[path] = FileSink(path, maxbytes, backups, compress)
+        else:
+            sink.configure(maxbytes, backups, compress)
+        return sink
+
+    def _release_sink(self, sink):
+        sink.refs -= 1
+        if sink.refs <= 0 and self._sinks.get(sink.path) is sink:
+            del self._sinks[sink.path]
+            os.close(sink.fd)
+
+    def watch(self, key, fds, on_line, on_eof=None, sinks=None):
+        """fds : {"stdout": fd, "stderr": fd} (read ends, repris en charge).
+
+        sinks : {"stdout": FileSink} pour les flux copiés tels quels.
+        """
+        sinks = sinks or {}
+        for name, fd in fds.items():
+            os.set_blocking(fd, False)
+            sink = sinks.get(name)
+            if sink is not None:
+                sink.refs += 1
+                try:
+                    fcntl.fcntl(fd, fcntl.F_SETPIPE_SZ, SPLICE_SIZE)
+                except (AttributeError, OSError):
+                    pass  # limite pipe-max-size / pipe-user-pages : taille par défaut
+            stream = OutputStream(key, name, fd, sink)
+            self.selector.register(fd, selectors.EVENT_READ, (stream, on_line, on_eof))
+        self._open[key] = self._open.get(key, 0) + len(fds)
+
+    def poll(self, timeout=0):
+        """Traite les pipes prêts ; retourne le nombre de flux servis."""
+        events = self.selector.select(timeout)
+        for selector_key, _ in events:
+            stream, on_line, on_eof = selector_key.data
+            if stream.sink is not None:
+                self._copy(stream, on_eof)
+            else:
+                self._read(stream, on_line, on_eof)
+        return len(events)
+
+    def _copy(self, stream, on_eof):
+        for _ in range(SPLICE_BURST):
+            try:
+                if stream.splice:
+                    n = written = os.splice(
+                        stream.fd, stream.sink.fd, stream.sink.room(SPLICE_SIZE), flags=SPLICE_FLAGS
+                    )
+                else:
+                    n, written = self._copy_buffered(stream)
+            except BlockingIOError:
+                return
+            except OSError:
+                if stream.splice:
+                    # fs sans splice, disque plein... : repli read + write, qui
+                    # vide le pipe même si l'écriture échoue
+                    stream.splice = False
+                    continue
+                # lecture du pipe en échec (EBADF, EIO...) : elle ne se
+                # rétablira pas, fermé comme à EOF plutôt que resélectionné
+                n = written = 0
+            if n == 0:
+                self._close(stream, on_eof)
+                return
+            # n octets lus mais écriture en échec : pas un EOF, et seul ce
+            # qui est arrivé dans le fichier compte pour la rotation
+            if written:
+                stream.sink.written(written)
+
+    def _copy_buffered(self, stream):
+        """-> (octets lus, octets écrits) ; la différence est comptée dans dropped."""
+        data = os.read(stream.fd, stream.sink.room(SPLICE_SIZE))
+        view = memoryview(data)
+        try:
+            while view:
+                view = view[os.write(stream.sink.fd, view):]
+        except OSError:
+            self.dropped += len(view)
+        return len(data), len(data) - len(view)
+
+    def _read(self, stream, on_line, on_eof):
+        try:
+            data = os.read(stream.fd, self.read_size)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+
+        if not data:
+            if stream.partial:
+                on_line(stream, stream.partial)
+                stream.partial = b""
+            self._close(stream, on_eof)
+            return
+
+        data = stream.partial + data
+        lines = data.split(b"\n")
+        stream.partial = lines.pop()
+        for line in lines:
+            on_line(stream, line)
+        if len(stream.partial) >= MAX_LINE:
+            on_line(stream, stream.partial)
+            stream.partial = b""
+
+    def _close(self, stream, on_eof):
+        self.selector.unregister(stream.fd)
+        try:
+            os.close(stream.fd)
+        except OSError:
+            pass  # déjà invalide (EBADF)
+        if stream.sink is not None:
+            self._release_sink(stream.sink)
+        self._open[stream.key] -= 1
+        if not self._open[stream.key]:
+            del self._open[stream.key]
+            if on_eof:
+                on_eof(stream.key)
+
+    def close(self):
+        for selector_key in list(self.selector.get_map().values()):
+            os.close(selector_key.fd)
+        for sink in self._sinks.values():
+            os.close(sink.fd)
+        self.selector.close()
+        self._open.clear()
+        self._sinks.clear()
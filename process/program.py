@@ -1,10 +1,110 @@
+import random
+from collections import deque
 from process.instance import ProcessInstance
 from config.program_config import ProgramConfig
+from process.spawn import SpawnPlan
+from utils.enums import ProcessState
+
+# état affiché d'un programme : le premier présent parmi ses instances
+STATE_PRIORITY = (
+    ProcessState.RUNNING, ProcessState.STARTING, ProcessState.BACKOFF,
+    ProcessState.STOPPING, ProcessState.FATAL,
+)
 
 class Program:
+    # incrémenté à chaque changement visible dans status, tous programmes
+    # confondus : un client qui a déjà vu cette génération n'a rien à relire
+    generation = 0
+
     def __init__(self, config: ProgramConfig):
         self.config = config
-        self.processes = [
-            ProcessInstance()
-            for _ in range(config.numprocs)
-        ]
+        self.spawn_plan = SpawnPlan(config)
+        self.counts = [0] * len(ProcessState)  # instances par état (index : state.value)
+        self._status = None
+        self.processes = []
+        self.add_instances(config.numprocs)
+        self.restart_history = deque()  # timestamps des restarts (fenêtre glissante)
+        self.breaker_open = False
+
+    def touch(self):
+        self._status = None
+        Program.generation += 1
+
+    def transition(self, old, new):
+        """Appelé par ProcessInstance à chaque changement d'état."""
+        self.counts[old.value] -= 1
+        self.counts[new.value] += 1
+        self.touch()
+
+    def add_instances(self, n):
+        added = [ProcessInstance() for _ in range(n)]
+        for index, inst in enumerate(added, len(self.processes)):
+            inst.index = index
+            inst.program = self
+            self.counts[inst.state.value] += 1
+        self.processes.extend(added)
+        self.touch()
+        return added
+
+    def remove_instances(self, numprocs):
+        """Détache les instances au-delà de numprocs et les renvoie ; elles
+        gardent leur index pour les événements de leur arrêt."""
+        excess = self.processes[numprocs:]
+        del self.processes[numprocs:]
+        for inst in excess:
+            self.counts[inst.state.value] -= 1
+            inst.program = None
+        self.touch()
+        return excess
+
+    def record_restart(self, now):
+        """Ajoute un restart à la fenêtre ; True si le circuit breaker vient de s'ouvrir."""
+        self.restart_history.append(now)
+        while self.restart_history[0] < now - self.config.crash_window:
+            self.restart_history.popleft()
+
+        # seuil par instance : un numprocs: 50 a droit à 50x plus de restarts
+        limit = self.config.crash_threshold * self.config.numprocs
+        if limit > 0 and not self.breaker_open and len(self.restart_history) > limit:
+            self.breaker_open = True
+            self.touch()
+            return True
+        return False
+
+    def reset_breaker(self):
+        if self.breaker_open:
+            self.breaker_open = False
+            self.touch()
+        self.restart_history.clear()
+
+    def backoff_delay(self, attempt):
+        """Délai exponentiel avec jitter avant la tentative n°attempt."""
+        if attempt <= 0:
+            return 0
+        delay = min(self.config.backoff_base * 2 ** min(attempt - 1, 32), self.config.backoff_max)
+        jitter = self.config.backoff_jitter
+        return delay * random.uniform(1 - jitter, 1 + jitter)
+
+    def state(self):
+        if self.breaker_open:
+            return "FATAL"
+        for state in STATE_PRIORITY:
+            if self.counts[state.value]:
+                return state.name
+        return "STOPPED"
+
+    def status(self):
+        """(état, instances RUNNING, numprocs, retries max, start_time de la
+        première instance RUNNING) ; recalculé seulement après un changement."""
+        if self._status is None:
+            since = None
+            for inst in self.processes:
+                if inst.state is ProcessState.RUNNING and inst.start_time:
+                    since = inst.start_time
+                    break
+            retries = max((inst.retry_count for inst in self.processes), default=0)
+            self._status = (
+                self.state(), self.counts[ProcessState.RUNNING.value],
+                self.config.numprocs, retries, since,
+            )
+        return self._status
@@ -0,0 +1,186 @@
+import os
+import pwd
+import shlex
+import shutil
+import signal
+import fcntl
+import termios
+import resource
+
+SHELL = "/bin/sh"
+
+# caractères qui, hors quotes, demandent un vrai shell
+SHELL_SPECIALS = set("|&;<>()$`\\*?[]{}~#\n")
+SHELL_BUILTINS = {
+    "cd", "exec", "export", "source", ".", "eval", "set", "unset", "ulimit",
+    "umask", "trap", "if", "for", "while", "until", "case", "!", "{",
+}
+RESET_SIGNALS = (signal.SIGPIPE, signal.SIGXFSZ)
+
+LOG_FLAGS = os.O_CREAT | os.O_WRONLY | os.O_APPEND
+
+# option de config -> ressource (0 = limite héritée du superviseur)
+RLIMITS = (
+    ("rlimit_as", resource.RLIMIT_AS),
+    ("rlimit_nofile", resource.RLIMIT_NOFILE),
+    ("rlimit_cpu", resource.RLIMIT_CPU),
+    ("rlimit_nproc", resource.RLIMIT_NPROC),
+)
+
+
+class SpawnError(Exception):
+    pass
+
+
+def needs_shell(cmd):
+    """True si cmd utilise une syntaxe shell (pipes, redirections, $VAR, globs...)."""
+    quote = None
+    for c in cmd:
+        if quote == "'":
+            if c == "'":
+                quote = None
+        elif quote == '"':
+            if c == '"':
+                quote = None
+            elif c in "$`\\":
+                return True
+        elif c in "'\"":
+            quote = c
+        elif c in SHELL_SPECIALS:
+            return True
+    return quote is not None
+
+
+class SpawnPlan:
+    """Plan de lancement calculé une seule fois au chargement de la config.
+
+    argv / env / uid / redirections sont résolus ici ; chaque start n'a plus
+    qu'à appeler spawn(). On passe par os.posix_spawn quand rien n'exige de
+    code dans l'enfant (user, workingdir, umask, rlimit_*, pty), sinon par fork + execve
+    avec le plan déjà résolu.
+    """
+
+    def __init__(self, config):
+        self.cmd = config.cmd
+        self.env = dict(os.environ)
+        self.env.update({k: str(v) for k, v in (config.env or {}).items()})
+        self.argv, self.path = self._resolve_argv(config.cmd)
+
+        self.uid = self.gid = None
+        self.error = None
+        if config.user:
+            try:
+                pw = pwd.getpwnam(config.user)
+                self.uid, self.gid = pw.pw_uid, pw.pw_gid
+            except KeyError:
+                self.error = f"User '{config.user}' not found"
+
+        self.stdout = config.stdout
+        self.stderr = config.stderr
+        self.workingdir = config.workingdir
+        self.umask = config.umask
+        self.rlimits = self._resolve_rlimits(config)
+        self.needs_fork = (
+            self.uid is not None or self.workingdir is not None or self.umask is not None
+            or bool(self.rlimits)
+        )
+
+    def _resolve_rlimits(self, config):
+        """[(ressource, (soft, hard))] à appliquer dans l'enfant avant exec.
+
+        hard = soft : l'enfant ne peut pas relever sa limite. Pour le CPU,
+        une seconde de marge entre SIGXCPU (soft) et SIGKILL (hard). Sans
+        privilège, on ne peut pas dépasser la limite hard du superviseur :
+        la valeur y est ramenée.
+        """
+        limits = []
+        for option, res in RLIMITS:
+            value = getattr(config, option)
+            if not value:
+                continue
+            hard = value + 1 if res == resource.RLIMIT_CPU else value
+            current = resource.getrlimit(res)[1]
+            if current != resource.RLIM_INFINITY:
+                hard = min(hard, current)
+            limits.append((res, (min(value, hard), hard)))
+        return limits
+
+    def _resolve_argv(self, cmd):
+        if not needs_shell(cmd):
+            try:
+                argv = shlex.split(cmd)
+            except ValueError:
+                argv = []
+            if argv and "=" not in argv[0] and argv[0] not in SHELL_BUILTINS:
+                path = shutil.which(argv[0], path=self.env.get("PATH", os.defpath))
+                if path:
+                    return argv, path
+        return ["sh", "-c", cmd], SHELL
+
+    def spawn(self, fds=None, pty_slave=None):
+        """Lance une instance et retourne son pid.
+
+        fds : {fd_enfant: fd_parent} qui remplace les fichiers stdout/stderr
+        de la config (ex: pipe du daemon). pty_slave : terminal de contrôle.
+        L'enfant a son propre process group : un Ctrl-C dans le shell de
+        contrôle ne lui est pas transmis.
+        """
+        if self.error:
+            raise SpawnError(self.error)
+        fds = fds or {}
+        if self.needs_fork or pty_slave is not None:
+            return self._fork_exec(fds, pty_slave)
+
+        actions = []
+        for fd, path in ((1, self.stdout), (2, self.stderr)):
+            if fd in fds:
+                actions.append((os.POSIX_SPAWN_DUP2, fds[fd], fd))
+            elif path:
+                actions.append((os.POSIX_SPAWN_OPEN, fd, path, LOG_FLAGS, 0o644))
+        return os.posix_spawn(
+            self.path, self.argv, self.env,
+            file_actions=actions, setsigdef=RESET_SIGNALS, setpgroup=0,
+        )
+
+    def _fork_exec(self, fds, pty_slave):
+        pid = os.fork()
+        if pid:
+            if pty_slave is None:
+                # aussi côté parent : le groupe existe dès le retour de spawn()
+                try:
+                    os.setpgid(pid, pid)
+                except OSError:
+                    pass
+            return pid
+
+        # Child : uniquement des appels système, tout est déjà résolu
+        try:
+            for sig in RESET_SIGNALS:
+                signal.signal(sig, signal.SIG_DFL)
+            if pty_slave is not None:
+                os.setsid()
+                fcntl.ioctl(pty_slave, termios.TIOCSCTTY, 0)
+                for fd in (0, 1, 2):
+                    os.dup2(pty_slave, fd)
+            else:
+                os.setpgid(0, 0)
+            for fd, path in ((1, self.stdout), (2, self.stderr)):
+                if fd in fds:
+                    os.dup2(fds[fd], fd)
+                elif path and pty_slave is None:
+                    target = os.open(path, LOG_FLAGS, 0o644)
+                    os.dup2(target, fd)
+                    os.close(target)
+            if self.workingdir:
+                os.chdir(self.workingdir)
+            if self.umask is not None:
+                os.umask(self.umask)
+            for res, limits in self.rlimits:
+                resource.setrlimit(res, limits)
+            if self.uid is not None:
+                os.setgid(self.gid)
+                os.setuid(self.uid)
+            os.execve(self.path, self.argv, self.env)
+        except Exception as e:
+            print(f"Failed to exec {self.cmd}: {e}", flush=True)
+        os._exit(1)
@@ -0,0 +1,171 @@
+import os
+
+USAGE = (
+    "usage: tail <program[:index]> [-n N] [-f] "
+    "(program with a stdout file: tail <program>, the file is shared by its instances)"
+)
+DEFAULT_LINES = 10
+FILE_BLOCK = 8192
+
+
+def parse_args(args):
+    """['web:1', '-n', '20', '-f'] -> ('web:1', 20, True) ; ValueError si invalide."""
+    target, n, follow = None, DEFAULT_LINES, False
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if arg == "-f":
+            follow = True
+        elif arg == "-n":
+            if not args or not args[0].isdigit():
+                raise ValueError(USAGE)
+            n = int(args.pop(0))
+        elif arg.startswith("-n") and arg[2:].isdigit():
+            n = int(arg[2:])
+        elif target is None and not arg.startswith("-"):
+            target = arg
+        else:
+            raise ValueError(USAGE)
+    if target is None:
+        raise ValueError(USAGE)
+    return target, n, follow
+
+
+def resolve(programs, target):
+    """'web' ou 'web:1' -> [(label, program, instance)] ; ValueError si inconnu.
+
+    Sortie dans un fichier : toutes les instances écrivent dans le même, il
+    est rendu une seule fois sous le nom du programme et web:N est refusé
+    (le fichier ne dit pas quelle ligne vient de quelle instance).
+    """
+    name, _, index = target.partition(":")
+    program = programs.get(name)
+    if program is None:
+        raise ValueError(f"Unknown program: {name}")
+    shared = _shared_file(program)
+    if index:
+        if not index.isdigit() or int(index) >= len(program.processes):
+            raise ValueError(f"Invalid instance index: {target}")
+        if shared and len(program.processes) > 1:
+            raise ValueError(
+                f"{name} writes to {shared}, shared by its instances: use 'tail {name}'"
+            )
+        return [(target, program, program.processes[int(index)])]
+    if shared or len(program.processes) == 1:
+        return [(name, program, program.processes[0])]
+    return [(f"{name}:{i}", program, inst) for i, inst in enumerate(program.processes)]
+
+
+def _log_file(program):
+    return program.config.stdout or program.config.stderr
+
+
+def _shared_file(program):
+    """Fichier de sortie commun si aucune instance n'a de ring buffer, sinon None."""
+    path = _log_file(program)
+    if path and all(_ring(program, inst) is None for inst in program.processes):
+        return path
+    return None
+
+
+def _ring(program, inst):
+    # stdout écrit dans un fichier (par l'enfant ou par splice) : le fichier
+    # fait foi, le ring ne contient au mieux que stderr
+    return None if program.config.stdout else inst.output
+
+
+def tail_file(path, n):
+    """n dernières lignes d'un fichier, lu par blocs depuis la fin."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            data = b""
+            while pos > 0 and data.count(b"\n") <= n:
+                step = min(FILE_BLOCK, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+    except OSError:
+        return []
+    lines = data.split(b"\n")
+    if lines and lines[-1] == b"":
+        lines.pop()
+    return lines[-n:] if n > 0 else []
+
+
+def read_tail(program, inst, n):
+    """Lignes (bytes) depuis le ring buffer de l'instance, sinon depuis son fichier de sortie."""
+    ring = _ring(program, inst)
+    if ring is not None:
+        return ring.tail(n)
+    path = _log_file(program)
+    return tail_file(path, n) if path else []
+
+
+class Follower:
+    """Suivi (tail -f) d'un ensemble d'instances : poll() rend les nouvelles lignes."""
+
+    def __init__(self, sources):
+        self.sources = sources
+        self.labels = len(sources) > 1
+        self.positions = {}
+        for label, program, inst in sources:
+            self.positions[label] = self._position(program, inst)
+
+    def _position(self, program, inst):
+        ring = _ring(program, inst)
+        if ring is not None:
+            return ("ring", ring, ring.seq)
+        path = _log_file(program)
+        try:
+            offset = os.path.getsize(path) if path else 0
+        except OSError:
+            offset = 0
+        return ("file", path, offset)
+
+    def initial(self, n):
+        return self._format(
+            (label, read_tail(program, inst, n)) for label, program, inst in self.sources
+        )
+
+    def poll(self):
+        new = []
+        for label, program, inst in self.sources:
+            kind, source, pos = self.positions[label]
+            ring = _ring(program, inst)
+            if ring is not None and ring is not source:
+                # sortie capturée depuis le début du suivi
+                kind, source, pos = "ring", ring, 0
+            if kind == "ring":
+                lines, pos = source.since(pos)
+            else:
+                lines, pos = self._read_file(source, pos)
+            self.positions[label] = (kind, source, pos)
+            new.append((label, lines))
+        return self._format(new)
+
+    def _read_file(self, path, offset):
+        if not path:
+            return [], offset
+        try:
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size < offset:
+                    offset = 0  # fichier tronqué / remplacé
+                f.seek(offset)
+                data = f.read()
+        except OSError:
+            return [], offset
+        # on ne rend que les lignes complètes
+        end = data.rfind(b"\n") + 1
+        lines = data[:end].split(b"\n")[:-1]
+        return lines, offset + end
+
+    def _format(self, chunks):
+        out = []
+        for label, lines in chunks:
+            for line in lines:
+                text = line.decode(errors="replace")
+                out.append(f"{label} | {text}" if self.labels else text)
+        return out
@@ -1,5 +1,10 @@
-from utils.enums import ProcessState
+from process import tail
+from process.journal import history
+from process.metrics import stats
+from utils.log_pipeline import pipeline
 import time
+import queue
+import threading
 import readline
 import rlcompleter
 import os
@@ -7,18 +12,21 @@ import os
 readline.parse_and_bind("bind ^I rl_complete")
 
 HISTORY_FILE = os.path.expanduser("~/.taskmaster_history")
+FOLLOW_INTERVAL = 0.5  # tail -f : période de relecture des sorties
 
 class ControlShell:
-    def __init__(self, manager):
+    def __init__(self, manager, boot=None):
         try:
             readline.read_history_file(HISTORY_FILE)
         except FileNotFoundError:
             pass
         self.manager = manager
         self.running = True
+        self.follower = None  # tail -f en cours
+        self.boot = boot      # BootPlanner de l'autostart, avancé par la boucle
         readline.set_history_length(100)
 
-        self.commands = ["start", "stop", "restart", "reload", "status", "exit"]
+        self.commands = ["start", "stop", "restart", "reload", "status", "tail", "history", "stats", "exit"]
         readline.parse_and_bind("tab: complete")
         readline.set_completer(self.complete)
         readline.parse_and_bind("set show-all-if-ambiguous on")
@@ -31,7 +39,7 @@ class ControlShell:
 
         if len(parts) == 1:
             options = [c for c in self.commands if c.startswith(parts[0])]
-        elif len(parts) == 2 and parts[0] in ("start", "stop", "restart", "status"):
+        elif len(parts) == 2 and parts[0] in ("start", "stop", "restart", "status", "tail", "history", "stats"):
             options = [
                 name for name in self.manager.programs.keys()
                 if name.startswith(parts[1])
@@ -46,85 +54,177 @@ class ControlShell:
 
 
     def run(self):
+        """Boucle de supervision : le prompt n'est qu'une source d'événements.
+
+        Un thread lit les commandes avec readline et réveille la boucle via
+        manager.wakeup(); SIGCHLD / SIGHUP la réveillent via le self-pipe.
+        Les restarts et reloads sont donc traités même si l'opérateur ne tape rien.
+        L'autostart (self.boot) avance dans cette même boucle : le prompt est
+        disponible pendant les start checks.
+        """
+        self._commands = queue.Queue()
+        self._command_done = threading.Event()
+        self._advance_boot()  # première vague lancée avant le prompt
+        # logs asynchrones : le prompt s'affiche après les messages en attente
+        pipeline.flush()
+        reader = threading.Thread(target=self._read_commands, daemon=True)
+        reader.start()
         try:
             while self.running:
-                # Gestion des process terminés
-                self.manager.process_exited()
-
-                # Traitement du reload demandé par SIGHUP (SAFE)
-                if self.manager.reload_requested:
-                    self.manager.reload_requested = False
-                    self.manager.log(
-                        "[TaskMaster] SIGHUP received, reloading configuration...",
-                        level="INFO"
-                    )
-                    self.manager.reload_config()
-
+                timeout = FOLLOW_INTERVAL if self.follower else None
+                if self.boot is not None:
+                    timeout = min(self.boot.timeout(), timeout or FOLLOW_INTERVAL)
                 try:
-                    cmd = input("taskmaster> ").strip()
-                    if cmd:
-                        readline.add_history(cmd)
-                except (KeyboardInterrupt, EOFError):
-                    print()
-                    for name in self.manager.programs.keys():
-                        self.manager.stop_program(name)
-                    break
-
-                if cmd == "":
+                    self.manager.wait(timeout)
+                except KeyboardInterrupt:
+                    # Ctrl-C pendant un tail -f : on arrête juste le suivi
+                    if not self.follower:
+                        raise
+                    self._stop_follow()
                     continue
-                elif cmd == "exit":
-                    for name in self.manager.programs.keys():
-                        self.manager.stop_program(name)
-                    self.running = False
-                elif cmd.startswith("start "):
-                    name = cmd.split(maxsplit=1)[1]
-                    self.manager.start_program(name)
-                elif cmd.startswith("stop "):
-                    name = cmd.split(maxsplit=1)[1]
-                    self.manager.stop_program(name)
-                elif cmd.startswith("status"):
-                    parts = cmd.split()
-                    if len(parts) == 1:
-                        for name, program in self.manager.programs.items():
-                            print(self.format_status(name, program))
-                    else:
-                        name = parts[1]
-                        program = self.manager.programs.get(name)
-                        if not program:
-                            print(f"Unknown program: {name}")
-                        else:
-                            print(self.format_status(name, program))
-                elif cmd == "reload":
-                    self.manager.reload_config()
-                elif cmd.startswith("restart "):
-                    name = cmd.split(maxsplit=1)[1]
-                    self.manager.restart_program(name)
-                else:
-                    print(f"Unknown command: '{cmd}'")
-
-                time.sleep(0.1)
-
+                self._advance_boot()
+                if self.follower:
+                    for line in self.follower.poll():
+                        print(line)
+
+                while self.running:
+                    try:
+                        cmd = self._commands.get_nowait()
+                    except queue.Empty:
+                        break
+                    if cmd is None:
+                        # EOF (Ctrl-D)
+                        print()
+                        self.stop_all()
+                        self.running = False
+                        break
+                    self.execute(cmd)
+                    if self.running and not self.follower:
+                        pipeline.flush()
+                        self._command_done.set()
+
+        except KeyboardInterrupt:
+            print()
+            self.stop_all()
         finally:
             # 🔹 Toujours sauvegarder l’historique
             readline.write_history_file(HISTORY_FILE)
 
-                
-    def format_status(self, name, program):
-        running = [p for p in program.processes if p.state == ProcessState.RUNNING]
-        stopped = [p for p in program.processes if p.state == ProcessState.STOPPED]
+    def _advance_boot(self):
+        if self.boot is not None and self.boot.step():
+            self.boot = None
+
+    def _read_commands(self):
+        while True:
+            try:
+                cmd = input("taskmaster> ").strip()
+                if cmd:
+                    readline.add_history(cmd)
+            except EOFError:
+                cmd = None
+
+            self._command_done.clear()
+            self._commands.put(cmd)
+            self.manager.wakeup()
+            if cmd is None:
+                return
+            # attend la fin de la commande avant de réafficher le prompt
+            self._command_done.wait()
+
+    def stop_all(self):
+        for name in self.manager.programs.keys():
+            self.manager.stop_program(name)
+        # pas de sortie avant le reaping : un enfant qui ignore stopsignal
+        # reçoit SIGKILL après stoptime au lieu d'être laissé orphelin
+        self.manager.wait_stopped()
+
+    def execute(self, cmd):
+        if cmd == "":
+            return
+        elif cmd == "exit":
+            self.stop_all()
+            self.running = False
+        elif cmd.startswith("start "):
+            name = cmd.split(maxsplit=1)[1]
+            self.manager.start_program(name)
+        elif cmd.startswith("stop "):
+            name = cmd.split(maxsplit=1)[1]
+            self.manager.stop_program(name)
+        elif cmd.startswith("status"):
+            parts = cmd.split()
+            if len(parts) == 1:
+                for name, program in self.manager.programs.items():
+                    print(self.format_status(name, program))
+            else:
+                name = parts[1]
+                program = self.manager.programs.get(name)
+                if not program:
+                    print(f"Unknown program: {name}")
+                else:
+                    print(self.format_status(name, program))
+        elif cmd == "reload":
+            self.manager.reload_config()
+        elif cmd.startswith("restart "):
+            name = cmd.split(maxsplit=1)[1]
+            self.manager.restart_program(name)
+        elif cmd == "tail" or cmd.startswith("tail "):
+            self.tail(cmd.split()[1:])
+        elif cmd == "history" or cmd.startswith("history "):
+            self.history(cmd.split()[1:])
+        elif cmd == "stats" or cmd.startswith("stats "):
+            self.stats(cmd.split()[1:])
+        else:
+            print(f"Unknown command: '{cmd}'")
 
-        retries = max((p.retry_count for p in program.processes), default=0)
-        uptime = None
-        for p in running:
-            if p.start_time:
-                uptime = int(time.time() - p.start_time)
-                break
+    def tail(self, args):
+        try:
+            target, n, follow = tail.parse_args(args)
+            sources = tail.resolve(self.manager.programs, target)
+        except ValueError as e:
+            print(e)
+            return
+
+        follower = tail.Follower(sources)
+        for line in follower.initial(n):
+            print(line)
+        if follow:
+            print("(Ctrl-C to stop following)")
+            self.follower = follower
+
+    def history(self, args):
+        if self.manager.journal is None:
+            print("History disabled (journal unavailable)")
+            return
+        try:
+            lines = history(self.manager.journal, self.manager.programs, args)
+        except ValueError as e:
+            print(e)
+            return
+        for line in lines:
+            print(line)
+
+    def stats(self, names):
+        try:
+            lines, _ = stats(self.manager.sampler, self.manager.programs, names)
+        except ValueError as e:
+            print(e)
+            return
+        for line in lines:
+            print(line)
+
+    def _stop_follow(self):
+        self.follower = None
+        print()
+        pipeline.flush()
+        self._command_done.set()
 
-        state = "RUNNING" if running else "STOPPED"
-        uptime_str = f"{uptime}s" if uptime is not None else "-"
+    def format_status(self, name, program):
+        # compteurs tenus à jour par les transitions : rien à reparcourir
+        state, running, _, retries, since = program.status()
+        uptime_str = f"{int(time.time() - since)}s" if since else "-"
 
         return (
             f"{name}: {state} "
-            f"({len(running)}/{len(program.processes)}) "
+            f"({running}/{len(program.processes)}) "
             f"retries={retries} uptime={uptime_str}"
         )
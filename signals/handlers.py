@@ -0,0 +1,31 @@
+import os
+import signal
+
+
+def install_wakeup_fd():
+    """Self-pipe non bloquant branché sur signal.set_wakeup_fd.
+
+    Chaque signal reçu (SIGCHLD, SIGHUP...) écrit un octet dans le pipe, ce qui
+    réveille la boucle de supervision bloquée dans select().
+    """
+    r, w = os.pipe()
+    os.set_blocking(r, False)
+    os.set_blocking(w, False)
+    signal.set_wakeup_fd(w, warn_on_full_buffer=False)
+    return r, w
+
+
+def notify_fd(fd):
+    try:
+        os.write(fd, b"\0")
+    except (BlockingIOError, OSError):
+        # pipe plein : un réveil est déjà en attente
+        pass
+
+
+def drain_fd(fd):
+    try:
+        while os.read(fd, 4096):
+            pass
+    except (BlockingIOError, OSError):
+        pass
@@ -3,3 +3,7 @@ from enum import Enum
 class ProcessState(Enum):
     STOPPED = 0
     RUNNING = 1
+    STARTING = 2   # lancé, pas encore resté en vie starttime secondes
+    STOPPING = 3   # stopsignal envoyé, SIGKILL après stoptime
+    BACKOFF = 4    # restart différé (backoff exponentiel) en attente
+    FATAL = 5      # abandon : retries épuisés ou circuit breaker ouvert
@@ -0,0 +1,164 @@
+import os
+import sys
+import time
+import atexit
+import threading
+from collections import deque
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+
+FLUSH_INTERVAL = 0.05  # fenêtre de regroupement des écritures (s)
+FSYNC_INTERVAL = 0     # 0 = jamais de fsync (comme avant), sinon période (s)
+MAX_PENDING = 65536    # au-delà, les messages sont comptés puis jetés
+
+
+def level_value(level):
+    return LEVELS.get(level, 0)
+
+
+_stamps = {}  # format -> (seconde, texte) : un strftime par seconde et par format
+
+
+def format_time(ts, fmt="%Y-%m-%d %H:%M:%S"):
+    second = int(ts)
+    cached = _stamps.get(fmt)
+    if cached is None or cached[0] != second:
+        cached = _stamps[fmt] = (second, time.strftime(fmt, time.localtime(second)))
+    return cached[1]
+
+
+class StreamSink:
+    """Sink vers un flux texte (sys.stdout) : relu à chaque écriture, daemonize le remplace."""
+
+    def __init__(self, name="stdout"):
+        self.name = name
+
+    def write(self, text):
+        stream = getattr(sys, self.name)
+        stream.write(text)
+        stream.flush()
+
+    def sync(self):
+        pass
+
+
+STDOUT = StreamSink()
+
+
+class LogPipeline:
+    """File unique des logs du superviseur, vidée par un thread writer.
+
+    submit(emit, *args) ne fait qu'un append : le formatage (timestamps,
+    json...) et les écritures ont lieu dans le writer, qui appelle
+    emit(*args) -> [(sink, texte), ...] puis écrit une fois par sink et par
+    lot. Un sink expose write(text) et sync() (RotatingFile, StreamSink).
+
+    File pleine (MAX_PENDING) : le message est jeté et compté, le compte est
+    écrit dans les sinks du lot suivant. flush() attend que la file soit
+    vide (prompt du shell, sortie du process).
+    """
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL, fsync_interval=FSYNC_INTERVAL,
+                 max_pending=MAX_PENDING):
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.max_pending = max_pending
+        self.pending = deque()
+        self.dropped = 0
+        self._reported = 0
+        self._wake = threading.Event()
+        self._pid = None
+        self._unsynced = set()
+        self._last_sync = time.monotonic()
+        self._busy = False  # lot retiré de la file mais pas encore écrit
+
+    def _start(self):
+        # après un fork (daemonize) : nouveau thread, la file héritée
+        # appartient au parent qui la vide lui-même à sa sortie
+        self._pid = os.getpid()
+        self.pending.clear()
+        self._wake = threading.Event()
+        threading.Thread(target=self._run, name="log-writer", daemon=True).start()
+
+    def submit(self, emit, *args):
+        if self._pid != os.getpid():
+            self._start()
+        if len(self.pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self.pending.append((emit, args))
+        if not self._wake.is_set():
+            self._wake.set()
+
+    def flush(self, timeout=2.0):
+        if self._pid != os.getpid() or not (self.pending or self._busy):
+            return
+        done = threading.Event()
+        self.pending.append((None, (done,)))
+        self._wake.set()
+        done.wait(timeout)
+
+    def _run(self):
+        wake = self._wake
+        while True:
+            # des écritures attendent leur fsync : on se réveille pour le faire
+            timeout = self.fsync_interval if self._unsynced and self.fsync_interval else None
+            if not wake.wait(timeout):
+                self._sync()
+                continue
+            self._busy = True
+            if self.flush_interval:
+                time.sleep(self.flush_interval)
+            wake.clear()
+            self._drain()
+            self._busy = False
+
+    def _drain(self):
+        batches = {}  # sink -> [textes], dans l'ordre d'arrivée
+        markers = []
+        pending = self.pending
+        while pending:
+            emit, args = pending.popleft()
+            if emit is None:
+                markers.append(args[0])
+                continue
+            try:
+                for sink, text in emit(*args):
+                    batches.setdefault(sink, []).append(text)
+            except Exception:
+                pass  # un message mal formé ne doit pas tuer le writer
+
+        dropped = self.dropped - self._reported
+        if dropped and batches:
+            self._reported += dropped
+            note = f"[LOG] {dropped} messages dropped (queue full)\n"
+            for texts in batches.values():
+                texts.append(note)
+
+        for sink, texts in batches.items():
+            try:
+                sink.write("".join(texts))
+            except (OSError, ValueError):
+                continue
+            self._unsynced.add(sink)
+        self._sync()
+        for done in markers:
+            done.set()
+
+    def _sync(self):
+        if not self.fsync_interval or not self._unsynced:
+            return
+        now = time.monotonic()
+        if now - self._last_sync < self.fsync_interval:
+            return
+        self._last_sync = now
+        for sink in self._unsynced:
+            try:
+                sink.sync()
+            except OSError:
+                pass
+        self._unsynced.clear()
+
+
+pipeline = LogPipeline()
+atexit.register(pipeline.flush)
@@ -0,0 +1,32 @@
+import os
+import stat
+
+# données privées par utilisateur (cache de config, journal) : jamais un
+# répertoire partagé comme /tmp
+PRIVATE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "taskmaster"
+)
+
+
+def private_dir(path=PRIVATE_DIR):
+    """path (créé si besoin) s'il est à nous et en 0700, sinon None."""
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        st = os.lstat(path)
+    except OSError:
+        return None
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() \
+            or stat.S_IMODE(st.st_mode) != 0o700:
+        return None
+    return path
+
+
+def open_private(path, flags, mode=0o600):
+    """os.open sans suivre de lien ; OSError si le fichier n'est pas un
+    fichier régulier à nous."""
+    fd = os.open(path, flags | os.O_NOFOLLOW | os.O_CLOEXEC, mode)
+    st = os.fstat(fd)
+    if not stat.S_ISREG(st.st_mode) or st.st_uid != os.getuid():
+        os.close(fd)
+        raise PermissionError(f"{path} is not a regular file owned by uid {os.getuid()}")
+    return fd
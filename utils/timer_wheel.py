@@ -0,0 +1,92 @@
+import time
+
+
+class Timer:
+    __slots__ = ("deadline", "callback", "args", "cancelled")
+
+    def __init__(self, deadline, callback, args):
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+
+class TimerWheel:
+    """Hashed timer wheel : schedule / cancel en O(1), advance proportionnel
+    au nombre de ticks écoulés et de timers échus.
+
+    Les timers dont l'échéance dépasse un tour de roue restent dans leur slot
+    et sont simplement ignorés tant que leur deadline n'est pas atteinte.
+    Les deadlines sont en time.monotonic().
+    """
+
+    def __init__(self, tick=0.05, slots=512):
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self.count = 0
+        self.on_schedule = None  # callback(deadline), ex: réarmer la boucle asyncio
+        self._tick = int(time.monotonic() / tick)
+
+    def schedule(self, delay, callback, *args):
+        deadline = time.monotonic() + max(delay, 0)
+        timer = Timer(deadline, callback, args)
+        index = max(int(deadline / self.tick), self._tick)
+        self.slots[index % len(self.slots)].append(timer)
+        self.count += 1
+        if self.on_schedule:
+            self.on_schedule(deadline)
+        return timer
+
+    def cancel(self, timer):
+        if timer is not None and not timer.cancelled:
+            timer.cancelled = True
+            self.count -= 1
+
+    def advance(self, now=None):
+        """Déclenche les timers échus ; retourne leur nombre."""
+        now = time.monotonic() if now is None else now
+        target = int(now / self.tick)
+        n = len(self.slots)
+        due = []
+
+        for index in range(self._tick, self._tick + min(target - self._tick + 1, n)):
+            slot = self.slots[index % n]
+            if not slot:
+                continue
+            keep = []
+            for timer in slot:
+                if timer.cancelled:
+                    continue
+                if timer.deadline <= now:
+                    due.append(timer)
+                else:
+                    keep.append(timer)
+            slot[:] = keep
+        self._tick = max(self._tick, target)
+
+        due.sort(key=lambda t: t.deadline)
+        for timer in due:
+            if timer.cancelled:
+                continue
+            timer.cancelled = True
+            self.count -= 1
+            timer.callback(*timer.args)
+        return len(due)
+
+    def timeout(self, now=None):
+        """Secondes avant la prochaine échéance (None si aucun timer)."""
+        if not self.count:
+            return None
+        now = time.monotonic() if now is None else now
+        n = len(self.slots)
+        for i in range(n):
+            index = self._tick + i
+            limit = (index + 1) * self.tick
+            deadlines = [
+                t.deadline for t in self.slots[index % n]
+                if not t.cancelled and t.deadline < limit
+            ]
+            if deadlines:
+                return max(min(deadlines) - now, 0)
+        # rien dans ce tour de roue : on repasse au tour suivant
+        return n * self.tick